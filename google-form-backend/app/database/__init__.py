@@ -1,4 +1,8 @@
 # Initialize the database package
-from .connection import get_database, connect_to_mongo, close_mongo_connection
+from .connection import get_database, get_read_database, get_client, connect_to_mongo, close_mongo_connection, warm_up_pool, pool_diagnostics
+from .indexes import ensure_indexes
 
-__all__ = ["get_database", "connect_to_mongo", "close_mongo_connection"]
+__all__ = [
+    "get_database", "get_read_database", "get_client", "connect_to_mongo", "close_mongo_connection",
+    "warm_up_pool", "pool_diagnostics", "ensure_indexes",
+]
@@ -1,24 +1,100 @@
 from motor.motor_asyncio import AsyncIOMotorClient
+import asyncio
 import os
 from dotenv import load_dotenv
+from pymongo.errors import PyMongoError
+from pymongo.read_preferences import Nearest, Primary, PrimaryPreferred, Secondary, SecondaryPreferred
+from app.database.monitoring import command_metrics, pool_metrics
 
 load_dotenv()
 
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "googleforms")
+# Multi-document transactions need a replica set or sharded cluster
+MONGODB_TRANSACTIONS = os.getenv("MONGODB_TRANSACTIONS", "false").lower() in ("1", "true", "yes")
+
+# Connection pool tuning, passed straight to the Motor client
+POOL_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", 100)),
+    "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", 0)),
+    "maxIdleTimeMS": int(os.getenv("MONGODB_MAX_IDLE_TIME_MS", 0)) or None,
+    "waitQueueTimeoutMS": int(os.getenv("MONGODB_WAIT_QUEUE_TIMEOUT_MS", 0)) or None,
+    "serverSelectionTimeoutMS": int(os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 30000)),
+    "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", 20000)),
+}
+# e.g. "zstd,snappy"; each needs its Python package (zstandard, python-snappy)
+MONGODB_COMPRESSORS = os.getenv("MONGODB_COMPRESSORS", "")
+
+# Where each class of read-only route reads from; writes and read-your-writes paths always use the primary.
+# primary, primaryPreferred, secondary, secondaryPreferred or nearest; secondary reads are opt-in
+READ_PREFERENCES = {
+    "public": os.getenv("READ_PREFERENCE_PUBLIC", "primary"),
+    "analytics": os.getenv("READ_PREFERENCE_ANALYTICS", "primary"),
+}
+# Skip secondaries lagging further than this behind the primary (at least 90); -1 means no bound
+MONGODB_MAX_STALENESS_SECONDS = int(os.getenv("MONGODB_MAX_STALENESS_SECONDS", 90))
+
+_READ_PREFERENCE_MODES = {
+    "primaryPreferred": PrimaryPreferred,
+    "secondary": Secondary,
+    "secondaryPreferred": SecondaryPreferred,
+    "nearest": Nearest,
+}
 
 class MongoDB:
     client: AsyncIOMotorClient = None
     database = None
+    read_databases = {}
+
+def _read_preference(mode: str):
+    if mode == "primary":
+        return Primary()
+    if mode not in _READ_PREFERENCE_MODES:
+        raise ValueError(f"Unknown read preference {mode!r}")
+    return _READ_PREFERENCE_MODES[mode](max_staleness=MONGODB_MAX_STALENESS_SECONDS)
 
 mongodb = MongoDB()
 
 async def connect_to_mongo():
     """Create database connection"""
-    mongodb.client = AsyncIOMotorClient(MONGODB_URL)
+    options = {k: v for k, v in POOL_OPTIONS.items() if v is not None}
+    if MONGODB_COMPRESSORS:
+        options["compressors"] = MONGODB_COMPRESSORS
+    mongodb.client = AsyncIOMotorClient(
+        MONGODB_URL,
+        event_listeners=[pool_metrics, command_metrics],
+        **options
+    )
     mongodb.database = mongodb.client[DATABASE_NAME]
+    # Same client and pool; only server selection differs per handle
+    mongodb.read_databases = {
+        route_class: mongodb.client.get_database(DATABASE_NAME, read_preference=_read_preference(mode))
+        for route_class, mode in READ_PREFERENCES.items()
+    }
     print("Connected to MongoDB")
 
+async def warm_up_pool():
+    """Open the first connections before traffic arrives instead of on the first requests"""
+    # Concurrent pings each need their own connection, filling the pool up to minPoolSize
+    try:
+        await asyncio.gather(*(
+            mongodb.client.admin.command("ping")
+            for _ in range(max(1, POOL_OPTIONS["minPoolSize"]))
+        ))
+    except PyMongoError as e:
+        print(f"MongoDB pool warm-up failed: {e}")
+        return
+    print(f"MongoDB pool warmed up ({pool_metrics.open_connections} connections)")
+
+def pool_diagnostics():
+    return {
+        "options": {**POOL_OPTIONS, "compressors": MONGODB_COMPRESSORS or None},
+        "pool": pool_metrics.snapshot(),
+        "commands": command_metrics.snapshot(),
+        "read_preferences": {**READ_PREFERENCES, "max_staleness_seconds": MONGODB_MAX_STALENESS_SECONDS},
+        "commands_by_server": command_metrics.servers(),
+    }
+
 async def close_mongo_connection():
     """Close database connection"""
     mongodb.client.close()
@@ -26,3 +102,10 @@ async def close_mongo_connection():
 
 def get_database():
     return mongodb.database
+
+def get_read_database(route_class: str):
+    """Database handle with the read preference configured for a route class ("public" or "analytics")"""
+    return mongodb.read_databases.get(route_class, mongodb.database)
+
+def get_client():
+    return mongodb.client
@@ -0,0 +1,51 @@
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
+from pymongo.errors import PyMongoError
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Replicas that don't own the schema can opt out of building indexes
+SKIP_INDEX_BOOTSTRAP = os.getenv("SKIP_INDEX_BOOTSTRAP", "false").lower() in ("1", "true", "yes")
+# The text index is maintained on every submit; turn it off if answer search isn't used
+RESPONSE_TEXT_INDEX = os.getenv("RESPONSE_TEXT_INDEX", "true").lower() in ("1", "true", "yes")
+
+# Indexes backing the query paths used by the routes, per collection
+INDEXES = {
+    "forms": [
+        # get_form_by_link
+        IndexModel([("unique_link", ASCENDING)], name="unique_link", unique=True),
+    ],
+    "responses": [
+        # get_form_responses keyset pages and time-ranged analytics
+        IndexModel(
+            [("form_id", ASCENDING), ("submitted_at", DESCENDING), ("_id", DESCENDING)],
+            name="form_id_submitted_at_id"
+        ),
+        # Keyset pagination of the summary on _id
+        IndexModel([("form_id", ASCENDING), ("_id", ASCENDING)], name="form_id_id"),
+        # Answer filters; answers.<field_id> paths are unique per form, so one index serves every form
+        IndexModel([("answers.$**", ASCENDING)], name="answers_wildcard"),
+    ],
+}
+
+if RESPONSE_TEXT_INDEX:
+    # Answer text search, scoped to one form by the equality prefix
+    INDEXES["responses"].append(
+        IndexModel([("form_id", ASCENDING), ("$**", TEXT)], name="form_id_text")
+    )
+
+
+async def ensure_indexes(db):
+    """Create any missing indexes; existing ones with the same spec are left alone"""
+    if SKIP_INDEX_BOOTSTRAP:
+        logger.info("Skipping index bootstrap (SKIP_INDEX_BOOTSTRAP is set)")
+        return
+
+    for collection, indexes in INDEXES.items():
+        try:
+            names = await db[collection].create_indexes(indexes)
+            logger.info(f"Indexes ready on {collection}: {', '.join(names)}")
+        except PyMongoError as e:
+            # A conflicting or failed build should not keep the API from starting
+            logger.error(f"Index build failed on {collection}: {e}")
@@ -0,0 +1,195 @@
+"""Connection pool and command listeners for the Motor client.
+
+pymongo calls these from the driver's worker threads, so every counter is
+guarded by a lock. Snapshots are served by /health/db.
+"""
+from collections import deque
+from contextvars import ContextVar
+from typing import Deque, Dict, Optional
+import threading
+import time
+
+from pymongo import monitoring
+
+# Recent durations kept per command for the percentile estimates
+LATENCY_SAMPLES = 1024
+
+
+def _percentile(samples, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class RequestDbTime:
+    """Mongo time accumulated by the commands issued while serving one request"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.seconds = 0.0
+        self.commands = 0
+
+    def add(self, duration_micros: int):
+        with self._lock:
+            self.seconds += duration_micros / 1_000_000
+            self.commands += 1
+
+
+# Motor copies the caller's context into its worker threads, so the listener
+# below sees the accumulator of the request that issued the command
+request_db_time: ContextVar[Optional[RequestDbTime]] = ContextVar("request_db_time", default=None)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Open/checked-out connections and time spent waiting for a checkout"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # A checkout starts and finishes on the same driver thread
+        self._checkout_started = threading.local()
+        self.open_connections = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.max_waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+        self._wait_ms: Deque[float] = deque(maxlen=LATENCY_SAMPLES)
+
+    def _checkout_finished(self, failed: bool):
+        started = getattr(self._checkout_started, "value", None)
+        with self._lock:
+            self.waiting = max(0, self.waiting - 1)
+            if failed:
+                self.checkout_failures += 1
+            else:
+                self.checkouts += 1
+                self.checked_out += 1
+                if started is not None:
+                    self._wait_ms.append((time.perf_counter() - started) * 1000)
+
+    def connection_check_out_started(self, event):
+        self._checkout_started.value = time.perf_counter()
+        with self._lock:
+            self.waiting += 1
+            self.max_waiting = max(self.max_waiting, self.waiting)
+
+    def connection_checked_out(self, event):
+        self._checkout_finished(failed=False)
+
+    def connection_check_out_failed(self, event):
+        self._checkout_finished(failed=True)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(0, self.checked_out - 1)
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open_connections += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open_connections = max(0, self.open_connections - 1)
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            wait_ms = list(self._wait_ms)
+            return {
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "wait_queue_depth": self.waiting,
+                "max_wait_queue_depth": self.max_waiting,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+                "checkout_wait_ms": {
+                    "p50": round(_percentile(wait_ms, 50), 3),
+                    "p99": round(_percentile(wait_ms, 99), 3),
+                    "max": round(max(wait_ms, default=0.0), 3),
+                },
+            }
+
+
+def _server(event) -> str:
+    host, port = event.connection_id
+    return f"{host}:{port}"
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """Per-command counts and latency as reported by the driver"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._commands: Dict[str, dict] = {}
+        # Commands per "host:port", to see where read preferences actually send reads
+        self._servers: Dict[str, int] = {}
+
+    def _record(self, command_name: str, duration_micros: int, failed: bool, server: str = None):
+        timer = request_db_time.get()
+        if timer is not None:
+            timer.add(duration_micros)
+
+        duration_ms = duration_micros / 1000
+        with self._lock:
+            if server is not None:
+                self._servers[server] = self._servers.get(server, 0) + 1
+            stats = self._commands.get(command_name)
+            if stats is None:
+                stats = self._commands[command_name] = {
+                    "count": 0, "failures": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "samples": deque(maxlen=LATENCY_SAMPLES),
+                }
+            stats["count"] += 1
+            stats["failures"] += int(failed)
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+            stats["samples"].append(duration_ms)
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self._record(event.command_name, event.duration_micros, failed=False, server=_server(event))
+
+    def failed(self, event):
+        self._record(event.command_name, event.duration_micros, failed=True, server=_server(event))
+
+    def servers(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._servers)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "count": stats["count"],
+                    "failures": stats["failures"],
+                    "mean_ms": round(stats["total_ms"] / stats["count"], 3),
+                    "p50_ms": round(_percentile(stats["samples"], 50), 3),
+                    "p99_ms": round(_percentile(stats["samples"], 99), 3),
+                    "max_ms": round(stats["max_ms"], 3),
+                }
+                for name, stats in self._commands.items()
+            }
+
+
+pool_metrics = PoolMetrics()
+command_metrics = CommandMetrics()
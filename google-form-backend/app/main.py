@@ -1,14 +1,32 @@
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from contextlib import asynccontextmanager
-from app.database.connection import connect_to_mongo, close_mongo_connection
+from app.database.connection import connect_to_mongo, close_mongo_connection, get_database, warm_up_pool, pool_diagnostics
+from app.database.indexes import ensure_indexes
 from app.routes import fields, forms, responses 
+from app.services.admission import AdmissionMiddleware, admission_stats
+from app.services.form_cache import form_cache
+from app.services.metrics import MetricsMiddleware, registry
+from app.services.sketches import sketch_buffer
+from app.services.submission_buffer import SUBMISSION_BUFFER, submission_buffer
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await connect_to_mongo()
+    await warm_up_pool()
+    await ensure_indexes(get_database())
+    await form_cache.start()
+    await sketch_buffer.start(get_database())
+    if SUBMISSION_BUFFER:
+        await submission_buffer.start(get_database())
     yield
+    if SUBMISSION_BUFFER:
+        await submission_buffer.stop()
+    # After the submission buffer, so its final flush is sketched too
+    await sketch_buffer.stop()
+    await form_cache.stop()
     await close_mongo_connection()
 
 app = FastAPI(
@@ -18,13 +36,18 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# The last middleware added runs first: metrics, then CORS, then admission.
+# Admission sits inside CORS so shed 503s still carry the CORS headers the frontend needs to read them.
+app.add_middleware(AdmissionMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[os.getenv("FRONTEND_URL", "http://localhost:3000")],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After"],
 )
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(fields.router, prefix="/api/v1")
 app.include_router(forms.router, prefix="/api/v1")
@@ -38,6 +61,30 @@ async def root():
 async def health_check():
     return {"status": "healthy", "message": "API is operational"}
 
+@app.get("/health/cache")
+async def cache_stats():
+    return {"form_cache": form_cache.stats()}
+
+@app.get("/health/submissions")
+async def submission_buffer_stats():
+    return {"submission_buffer": submission_buffer.stats()}
+
+@app.get("/health/admission")
+async def admission_control_stats():
+    return {"admission": admission_stats()}
+
+@app.get("/health/sketches")
+async def sketch_stats():
+    return {"sketches": sketch_buffer.stats()}
+
+@app.get("/health/db")
+async def db_diagnostics():
+    return pool_diagnostics()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -1,6 +1,6 @@
 from .field import FieldModel, FieldType
 from .form import FormModel, FormSettings, FormFieldEmbedded
-from .form_response import ResponseModel, FieldResponseData, ResponseSummary  # ✅ Fixed import path
+from .responses import ResponseModel, FieldResponseData, ResponseSummary
 
 __all__ = [
     "FieldModel",
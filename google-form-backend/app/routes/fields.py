@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+from fastapi import APIRouter, HTTPException, Query, status
+from typing import Optional
 from app.database.connection import get_database
-from app.schemas.field import Field, FieldCreate, FieldUpdate, FieldInDB
+from app.schemas.field import Field, FieldCreate, FieldUpdate, FieldInDB, FieldPage
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page
 from bson import ObjectId
+from pymongo import ReturnDocument
 from datetime import datetime
 
 router = APIRouter(prefix="/fields", tags=["fields"])
@@ -15,27 +17,32 @@ async def create_field(field: FieldCreate):
     field_dict["created_at"] = datetime.utcnow()
     
     result = await db.fields.insert_one(field_dict)
-    created_field = await db.fields.find_one({"_id": result.inserted_id})
     
-    # Convert ObjectId to string for response
-    created_field["id"] = str(created_field["_id"])
-    del created_field["_id"]
+    # Echo the inserted document instead of reading it back
+    field_dict["id"] = str(result.inserted_id)
+    del field_dict["_id"]
     
-    return Field(**created_field)
+    return Field(**field_dict)
 
-@router.get("/", response_model=List[Field])
-async def get_fields(skip: int = 0, limit: int = 100):
+@router.get("/", response_model=FieldPage)
+async def get_fields(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
     db = get_database()
     
-    cursor = db.fields.find().skip(skip).limit(limit)
-    fields = []
+    try:
+        documents, next_cursor = await fetch_page(db.fields, {}, [("_id", 1)], cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    async for field in cursor:
+    fields = []
+    for field in documents:
         field["id"] = str(field["_id"])
         del field["_id"]
         fields.append(Field(**field))
     
-    return fields
+    return FieldPage(items=fields, next_cursor=next_cursor)
 
 @router.get("/{field_id}", response_model=Field)
 async def get_field(field_id: str):
@@ -65,15 +72,15 @@ async def update_field(field_id: str, field_update: FieldUpdate):
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
     
-    result = await db.fields.update_one(
+    updated_field = await db.fields.find_one_and_update(
         {"_id": ObjectId(field_id)}, 
-        {"$set": update_data}
+        {"$set": update_data},
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if updated_field is None:
         raise HTTPException(status_code=404, detail="Field not found")
     
-    updated_field = await db.fields.find_one({"_id": ObjectId(field_id)})
     updated_field["id"] = str(updated_field["_id"])
     del updated_field["_id"]
     
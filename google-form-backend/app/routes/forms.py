@@ -1,32 +1,57 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import List
-from app.database.connection import get_database
-from app.schemas.form import Form, FormCreate, FormUpdate
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from typing import List, Optional
+from app.database.connection import MONGODB_TRANSACTIONS, READ_PREFERENCES, get_client, get_database, get_read_database
+from app.schemas.form import Form, FormCreate, FormPage, FormSummary, FormSummaryPage, FormUpdate, PublicForm
+from app.services.etag import cache_headers, combined_etag, etag_matches, form_etag, public_form_etag
+from app.services.fast_json import FAST_JSON_RESPONSES, dumps, trusted_form, trusted_items, trusted_public_form
+from app.services.form_cache import CachedForm, form_cache
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, fetch_page
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import PyMongoError
 from datetime import datetime
+import json
 import uuid
 import logging
 
 router = APIRouter(prefix="/forms", tags=["forms"])
 logger = logging.getLogger(__name__)
 
+# Only what the dashboard shows; the embedded fields array is reduced to its length in Mongo
+SUMMARY_PROJECTION = {
+    "title": 1,
+    "description": 1,
+    "unique_link": 1,
+    "is_active": 1,
+    "created_at": 1,
+    "updated_at": 1,
+    "version": 1,
+    "total_responses": 1,
+    "last_response_at": 1,
+    "field_count": {"$size": {"$ifNull": ["$fields", []]}},
+}
+
 
 @router.post("/", response_model=Form)
 async def create_form(form: FormCreate):
     db = get_database()
 
+    field_documents = []
     form_fields = []
     for index, field_input in enumerate(form.fields):
         field_data = field_input.field_details
-        field_id = str(ObjectId())  # Generate unique field ID
+        field_id = ObjectId()  # Generate unique field ID
 
-        await db.fields.insert_one({
-            "_id": ObjectId(field_id),
-            **field_data
+        field_documents.append({
+            "_id": field_id,
+            **field_data,
+            "created_at": datetime.utcnow()
         })
 
         form_fields.append({
-            "field_id": field_id,
+            "field_id": str(field_id),
             "position": index,
             "field_details": field_data
         })
@@ -37,25 +62,50 @@ async def create_form(form: FormCreate):
         "unique_link": str(uuid.uuid4()),
         "is_active": True,
         "created_at": datetime.utcnow(),
-        "fields": form_fields
+        "updated_at": datetime.utcnow(),
+        "version": 1,
+        "fields": form_fields,
+        "total_responses": 0,
+        "last_response_at": None
     }
 
-    result = await db.forms.insert_one(form_dict)
-    created_form = await db.forms.find_one({"_id": result.inserted_id})
+    if MONGODB_TRANSACTIONS:
+        async with await get_client().start_session() as session:
+            async with session.start_transaction():
+                result = await _insert_form(db, field_documents, form_dict, session)
+    else:
+        result = await _insert_form(db, field_documents, form_dict)
 
-    created_form["id"] = str(created_form["_id"])
-    del created_form["_id"]
+    # The inserted document is already in hand, so echo it instead of reading it back
+    form_dict["id"] = str(result.inserted_id)
+    del form_dict["_id"]
 
-    return Form(**created_form)
+    return Form(**form_dict)
 
 
-@router.get("/", response_model=List[Form])
-async def get_forms(skip: int = 0, limit: int = 100):
+@router.get("/", response_model=FormPage)
+async def get_forms(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+):
     db = get_database()
-    cursor = db.forms.find().skip(skip).limit(limit)
-    forms = []
+    try:
+        documents, next_cursor = await fetch_page(db.forms, {}, [("_id", 1)], cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    # Compare against the client's copy before paying for validation and serialization
+    etag = combined_etag([*(form_etag(form) for form in documents), next_cursor or ""])
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers(etag))
 
-    async for form in cursor:
+    if FAST_JSON_RESPONSES:
+        page = {"items": trusted_items(trusted_form, documents, "form"), "next_cursor": next_cursor}
+        return Response(content=dumps(page), media_type="application/json", headers=cache_headers(etag))
+
+    forms = []
+    for form in documents:
         try:
             form["id"] = str(form["_id"])
             del form["_id"]
@@ -63,38 +113,62 @@ async def get_forms(skip: int = 0, limit: int = 100):
         except Exception as e:
             logger.warning(f"Skipping malformed form document: {e}")
 
-    return forms
+    page = FormPage(items=forms, next_cursor=next_cursor)
+    return JSONResponse(content=jsonable_encoder(page), headers=cache_headers(etag))
 
 
-@router.get("/{form_id}", response_model=Form)
-async def get_form(form_id: str):
+@router.get("/summary", response_model=FormSummaryPage)
+async def get_form_summaries(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+):
     db = get_database()
+    try:
+        documents, next_cursor = await fetch_page(
+            db.forms, {}, [("_id", 1)], cursor, limit, projection=SUMMARY_PROJECTION
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-    if not ObjectId.is_valid(form_id):
-        raise HTTPException(status_code=400, detail="Invalid form ID")
+    etag = combined_etag([*(form_etag(form) for form in documents), next_cursor or "", "summary"])
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=cache_headers(etag))
 
-    form = await db.forms.find_one({"_id": ObjectId(form_id)})
-    if not form:
-        raise HTTPException(status_code=404, detail="Form not found")
+    summaries = []
+    for form in documents:
+        form["id"] = str(form.pop("_id"))
+        summaries.append(FormSummary(**form))
+
+    page = FormSummaryPage(items=summaries, next_cursor=next_cursor)
+    return JSONResponse(content=jsonable_encoder(page), headers=cache_headers(etag))
 
-    form["id"] = str(form["_id"])
-    del form["_id"]
 
-    return Form(**form)
+@router.get("/{form_id}", response_model=PublicForm)
+async def get_form(form_id: str, if_none_match: Optional[str] = Header(None)):
+    if not ObjectId.is_valid(form_id):
+        raise HTTPException(status_code=400, detail="Invalid form ID")
 
+    cached = await form_cache.get("id", form_id)
+    if cached is None:
+        form = await _find_public_form({"_id": ObjectId(form_id)})
+        if not form:
+            raise HTTPException(status_code=404, detail="Form not found")
+        cached = await _cache_form(form)
 
-@router.get("/link/{unique_link}", response_model=Form)
-async def get_form_by_link(unique_link: str):
-    db = get_database()
+    return _form_response(cached, if_none_match)
 
-    form = await db.forms.find_one({"unique_link": unique_link})
-    if not form:
-        raise HTTPException(status_code=404, detail="Form not found")
 
-    form["id"] = str(form["_id"])
-    del form["_id"]
+@router.get("/link/{unique_link}", response_model=PublicForm)
+async def get_form_by_link(unique_link: str, if_none_match: Optional[str] = Header(None)):
+    cached = await form_cache.get("link", unique_link)
+    if cached is None:
+        form = await _find_public_form({"unique_link": unique_link})
+        if not form:
+            raise HTTPException(status_code=404, detail="Form not found")
+        cached = await _cache_form(form)
 
-    return Form(**form)
+    return _form_response(cached, if_none_match)
 
 
 @router.put("/{form_id}", response_model=Form)
@@ -109,15 +183,20 @@ async def update_form(form_id: str, form_update: FormUpdate):
     if not update_data:
         raise HTTPException(status_code=400, detail="No data to update")
 
-    result = await db.forms.update_one(
+    update_data["updated_at"] = datetime.utcnow()
+
+    # Every write bumps the version that the form's ETag is derived from
+    updated_form = await db.forms.find_one_and_update(
         {"_id": ObjectId(form_id)},
-        {"$set": update_data}
+        {"$set": update_data, "$inc": {"version": 1}},
+        return_document=ReturnDocument.AFTER
     )
 
-    if result.matched_count == 0:
+    if updated_form is None:
         raise HTTPException(status_code=404, detail="Form not found")
 
-    updated_form = await db.forms.find_one({"_id": ObjectId(form_id)})
+    await form_cache.invalidate(form_id)
+
     updated_form["id"] = str(updated_form["_id"])
     del updated_form["_id"]
 
@@ -136,4 +215,53 @@ async def delete_form(form_id: str):
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Form not found")
 
+    await form_cache.invalidate(form_id)
+
     return {"message": "Form deleted successfully"}
+
+
+async def _insert_form(db, field_documents: List[dict], form_dict: dict, session=None):
+    """Write all fields in one batch, then the form that embeds them"""
+    try:
+        if field_documents:
+            await db.fields.insert_many(field_documents, session=session)
+        return await db.forms.insert_one(form_dict, session=session)
+    except PyMongoError:
+        # A failed batch may still have written some fields; inside a transaction the abort discards them
+        if session is None and field_documents:
+            await db.fields.delete_many({"_id": {"$in": [f["_id"] for f in field_documents]}})
+        raise
+
+
+async def _find_public_form(query: dict) -> Optional[dict]:
+    """Form lookup for public loads; a miss on a secondary is retried on the primary"""
+    form = await get_read_database("public").forms.find_one(query)
+    if form is None and READ_PREFERENCES["public"] != "primary":
+        # A form created moments ago may not have replicated yet
+        form = await get_database().forms.find_one(query)
+    return form
+
+
+async def _cache_form(form: dict) -> CachedForm:
+    """Serialize a form document once and cache the JSON with its ETag.
+
+    The public payload leaves out the response counters, so submissions don't
+    change the ETag respondents revalidate against; the counters are served
+    by the listing and summary routes.
+    """
+    etag = public_form_etag(form)
+    if FAST_JSON_RESPONSES:
+        payload = dumps(trusted_public_form(form))
+    else:
+        payload = json.dumps(jsonable_encoder(PublicForm(id=str(form["_id"]), **form))).encode("utf-8")
+
+    cached = CachedForm(etag, payload)
+    await form_cache.set(str(form["_id"]), form["unique_link"], cached)
+    return cached
+
+
+def _form_response(cached: CachedForm, if_none_match: Optional[str]) -> Response:
+    headers = cache_headers(cached.etag)
+    if etag_matches(if_none_match, cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.payload, media_type="application/json", headers=headers)
@@ -1,11 +1,44 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import List
-from app.database.connection import get_database
-from app.schemas.response import FormResponse, FormResponseCreate
+from fastapi import APIRouter, Header, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional
+from app.database.connection import READ_PREFERENCES, get_database, get_read_database
+from app.database.indexes import RESPONSE_TEXT_INDEX
+from app.schemas.response import (
+    FormResponse, FormResponseCreate, FormResponsePage, BulkResponseCreate, BulkResponseItem, BulkResponseResult,
+    FieldValidationError, ResponseSearch,
+)
+from app.models.responses import ResponseSummary
+from app.services.answers import ANSWERS_PROJECTION, answer_pairs, response_answers, store_answers
+from app.services.analytics import build_analytics_pipeline, shape_analytics
+from app.services.export import EXPORT_BATCH_SIZE, export_columns, stream_csv, stream_xlsx
+from app.services.etag import cache_headers, combined_etag, content_etag, etag_matches, form_etag
+from app.services.fast_json import FAST_JSON_RESPONSES, dumps, trusted_items, trusted_response
+from app.services.field_index import build_field_index, field_name
+from app.services.form_stats import get_form_stats, record_submission, record_submissions
+from app.services.response_filters import build_response_query
+from app.services.sketches import get_form_sketches
+from app.services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, fetch_page, keyset_filter
+from app.services.submission_buffer import SUBMISSION_BUFFER, BufferFullError, submission_buffer
+from app.services.validation import FieldError, validator_cache
 from bson import ObjectId
+from pymongo.errors import BulkWriteError, PyMongoError
 from datetime import datetime
+import json
+import logging
+import os
+
+SUMMARY_PAGE_SIZE = int(os.getenv("SUMMARY_PAGE_SIZE", 100))
+SUMMARY_MAX_PAGE_SIZE = int(os.getenv("SUMMARY_MAX_PAGE_SIZE", 1000))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", 10000))
+BULK_INSERT_CHUNK_SIZE = int(os.getenv("BULK_INSERT_CHUNK_SIZE", 1000))
+# Oldest first, served from the (form_id, _id) index
+SUMMARY_SORT = [("_id", 1)]
+# Only then do the form's version and counter describe what the response scans will see
+ANALYTICS_READS_PRIMARY = READ_PREFERENCES["analytics"] == "primary"
 
 router = APIRouter(prefix="/responses", tags=["responses"])
+logger = logging.getLogger(__name__)
 
 @router.post("/", response_model=FormResponse)
 async def submit_response(response: FormResponseCreate):
@@ -19,55 +52,165 @@ async def submit_response(response: FormResponseCreate):
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
     
-    # Validate field responses against form fields
-    form_field_ids = [field["field_id"] for field in form.get("fields", [])]
-    response_field_ids = [fr.field_id for fr in response.field_responses]
-    
-    for field_id in response_field_ids:
-        if field_id not in form_field_ids:
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Field {field_id} is not part of this form"
-            )
+    # Validate field responses against the form's compiled rules
+    errors = validator_cache.get(form).validate(response.field_responses)
+    if errors:
+        return JSONResponse(
+            status_code=400,
+            content={"detail": errors[0].message, "errors": [error._asdict() for error in errors]}
+        )
+    field_index = build_field_index(form)
     
     # Create response document
-    response_dict = {
-        "form_id": response.form_id,
-        "submitted_at": datetime.utcnow(),
-        "field_responses": [
-            {
-                "field_id": fr.field_id,
-                "value": fr.value
-            }
-            for fr in response.field_responses
-        ]
-    }
+    response_dict = _response_document(response, field_index)
     
-    result = await db.responses.insert_one(response_dict)
-    created_response = await db.responses.find_one({"_id": result.inserted_id})
+    if SUBMISSION_BUFFER:
+        # Acknowledge once it is in the local log; the flusher writes it to Mongo
+        try:
+            inserted_id = await submission_buffer.submit(response_dict)
+        except BufferFullError:
+            raise HTTPException(status_code=503, detail="Too many pending submissions, try again shortly")
+    else:
+        result = await db.responses.insert_one(response_dict)
+        inserted_id = result.inserted_id
+        try:
+            await record_submission(db, response.form_id, field_index, response_dict)
+        except PyMongoError as e:
+            # The response is stored; a 500 would only invite a duplicating retry
+            logger.error(f"Counters missed response {inserted_id} of form {response.form_id}, rebuild with "
+                         f"python -m app.services.form_stats {response.form_id}: {e}")
     
-    # Convert ObjectId to string for response
-    created_response["id"] = str(created_response["_id"])
-    del created_response["_id"]
+    # Echo the inserted document instead of reading it back
+    return FormResponse(**_api_response(response_dict))
+
+@router.post("/bulk", response_model=BulkResponseResult)
+async def submit_responses_bulk(bulk: BulkResponseCreate):
+    db = get_database()
+    
+    if len(bulk.responses) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} responses per request")
+    
+    # Load every referenced form once
+    form_ids = {r.form_id for r in bulk.responses if ObjectId.is_valid(r.form_id)}
+    field_indexes, validators = {}, {}
+    async for form in db.forms.find({"_id": {"$in": [ObjectId(form_id) for form_id in form_ids]}}):
+        field_indexes[str(form["_id"])] = build_field_index(form)
+        validators[str(form["_id"])] = validator_cache.get(form)
     
-    return FormResponse(**created_response)
+    results = [BulkResponseItem(index=index) for index in range(len(bulk.responses))]
+    documents = []  # (index, document) pairs that passed validation
+    for index, response in enumerate(bulk.responses):
+        if not ObjectId.is_valid(response.form_id):
+            results[index].error = "Invalid form ID"
+        elif response.form_id not in field_indexes:
+            results[index].error = "Form not found"
+        else:
+            errors = validators[response.form_id].validate(response.field_responses)
+            if errors:
+                results[index].error = errors[0].message
+                results[index].errors = _field_errors(errors)
+            else:
+                documents.append((index, _response_document(response, field_indexes[response.form_id])))
+    
+    # Unordered so one bad document doesn't stop the rest of its chunk
+    inserted_count = 0
+    for start in range(0, len(documents), BULK_INSERT_CHUNK_SIZE):
+        chunk = documents[start:start + BULK_INSERT_CHUNK_SIZE]
+        for _, document in chunk:
+            document.setdefault("_id", ObjectId())
+        failed = {}
+        try:
+            await db.responses.insert_many([document for _, document in chunk], ordered=False)
+        except BulkWriteError as e:
+            failed = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+        except PyMongoError as e:
+            # Part of the chunk may have been stored before the error; report per item what actually was
+            logger.error(f"Bulk insert of {len(chunk)} responses failed: {e}")
+            failed = await _unstored_positions(db, chunk)
+        
+        inserted_by_form = {}
+        for position, (index, document) in enumerate(chunk):
+            if position in failed:
+                results[index].error = failed[position]
+            else:
+                results[index].id = str(document["_id"])
+                inserted_by_form.setdefault(document["form_id"], []).append(document)
+        
+        # Counted chunk by chunk, so a later failure can't leave stored responses uncounted
+        for form_id, inserted in inserted_by_form.items():
+            inserted_count += len(inserted)
+            try:
+                await record_submissions(db, form_id, field_indexes[form_id], inserted)
+            except PyMongoError as e:
+                # The responses are stored; failing the request would only invite a duplicating retry
+                logger.error(f"Counters missed {len(inserted)} responses of form {form_id}, rebuild with "
+                             f"python -m app.services.form_stats {form_id}: {e}")
+    
+    return BulkResponseResult(
+        inserted=inserted_count,
+        failed=len(results) - inserted_count,
+        results=results
+    )
+
+@router.get("/form/{form_id}", response_model=FormResponsePage)
+async def get_form_responses(
+    form_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    read_db = get_read_database("analytics")
+    
+    if not ObjectId.is_valid(form_id):
+        raise HTTPException(status_code=400, detail="Invalid form ID")
+    
+    # Newest first, served from the (form_id, submitted_at, _id) index
+    try:
+        documents, next_cursor = await fetch_page(
+            read_db.responses, {"form_id": form_id}, [("submitted_at", -1), ("_id", -1)], cursor, limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    if FAST_JSON_RESPONSES:
+        page = {"items": trusted_items(trusted_response, documents, "response"), "next_cursor": next_cursor}
+        return Response(content=dumps(page), media_type="application/json")
+    
+    responses = [FormResponse(**_api_response(response)) for response in documents]
+    return FormResponsePage(items=responses, next_cursor=next_cursor)
 
-@router.get("/form/{form_id}", response_model=List[FormResponse])
-async def get_form_responses(form_id: str):
+@router.post("/form/{form_id}/search", response_model=FormResponsePage)
+async def search_form_responses(
+    form_id: str,
+    search: ResponseSearch,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
     db = get_database()
     
     if not ObjectId.is_valid(form_id):
         raise HTTPException(status_code=400, detail="Invalid form ID")
+    if search.text and not RESPONSE_TEXT_INDEX:
+        raise HTTPException(status_code=400, detail="Text search is disabled")
     
-    cursor = db.responses.find({"form_id": form_id})
-    responses = []
+    form = await db.forms.find_one({"_id": ObjectId(form_id)})
+    if not form:
+        raise HTTPException(status_code=404, detail="Form not found")
+    
+    try:
+        query = build_response_query(form_id, search, build_field_index(form))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    async for response in cursor:
-        response["id"] = str(response["_id"])
-        del response["_id"]
-        responses.append(FormResponse(**response))
+    # Same order and cursor as the unfiltered listing
+    try:
+        documents, next_cursor = await fetch_page(
+            get_read_database("analytics").responses, query, [("submitted_at", -1), ("_id", -1)], cursor, limit
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
     
-    return responses
+    responses = [FormResponse(**_api_response(response)) for response in documents]
+    return FormResponsePage(items=responses, next_cursor=next_cursor)
 
 @router.get("/{response_id}", response_model=FormResponse)
 async def get_response(response_id: str):
@@ -80,13 +223,16 @@ async def get_response(response_id: str):
     if not response:
         raise HTTPException(status_code=404, detail="Response not found")
     
-    response["id"] = str(response["_id"])
-    del response["_id"]
-    
-    return FormResponse(**response)
+    return FormResponse(**_api_response(response))
 
 @router.get("/form/{form_id}/summary")
-async def get_form_response_summary(form_id: str):
+async def get_form_response_summary(
+    form_id: str,
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(SUMMARY_PAGE_SIZE, ge=1, le=SUMMARY_MAX_PAGE_SIZE),
+    stream: bool = Query(False, description="Stream every response as NDJSON instead of one page"),
+    if_none_match: Optional[str] = Header(None),
+):
     db = get_database()
     
     if not ObjectId.is_valid(form_id):
@@ -97,39 +243,193 @@ async def get_form_response_summary(form_id: str):
     if not form:
         raise HTTPException(status_code=404, detail="Form not found")
     
-    # Get all responses for this form
-    cursor = db.responses.find({"form_id": form_id})
-    responses = []
-    async for response in cursor:
-        responses.append(response)
+    field_index = build_field_index(form)
+    query = {"form_id": form_id}
+    # The form lookup above stays on the primary; the response scans go where analytics reads are routed
+    read_db = get_read_database("analytics")
+    
+    if stream:
+        if cursor is not None:
+            try:
+                query = {"$and": [query, keyset_filter(SUMMARY_SORT, decode_cursor(cursor))]}
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+        
+        # One row per line, written as the cursor yields documents
+        async def ndjson_rows():
+            async for response in read_db.responses.find(query).sort(SUMMARY_SORT):
+                row = _summary_row(response, field_index)
+                if FAST_JSON_RESPONSES:
+                    yield dumps(row) + b"\n"
+                else:
+                    yield json.dumps(jsonable_encoder(row)) + "\n"
+        
+        return StreamingResponse(ndjson_rows(), media_type="application/x-ndjson")
+    
+    # The form's version and response counter tag the page, so unchanged pages skip the scan.
+    # A secondary can lag behind that counter; then the page is tagged by its content instead.
+    etag = None
+    if ANALYTICS_READS_PRIMARY:
+        etag = combined_etag([form_etag(form), cursor or "", str(limit)])
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=cache_headers(etag))
     
-    # Create summary with field names
+    try:
+        page, next_cursor = await fetch_page(read_db.responses, query, SUMMARY_SORT, cursor, limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    # Kept up to date on submit, so no page has to count the form's responses
     summary = {
         "form_title": form["title"],
-        "total_responses": len(responses),
-        "responses": []
+        "total_responses": form.get("total_responses", 0),
+        "responses": [_summary_row(response, field_index) for response in page],
+        "next_cursor": next_cursor,
     }
+    return _tagged_json(jsonable_encoder(summary), etag, if_none_match)
+
+
+@router.get("/form/{form_id}/export")
+async def export_form_responses(
+    form_id: str,
+    format: str = Query("csv", description="csv or xlsx"),
+    accept_encoding: Optional[str] = Header(None),
+):
+    db = get_database()
     
-    for response in responses:
-        response_data = {
-            "response_id": str(response["_id"]),
-            "submitted_at": response["submitted_at"],
-            "answers": {}
-        }
-        
-        # Map field responses to field names
-        for field_response in response["field_responses"]:
-            field_id = field_response["field_id"]
-            # Find field details in form
-            field_details = None
-            for form_field in form.get("fields", []):
-                if form_field["field_id"] == field_id:
-                    field_details = form_field["field_details"]
-                    break
-            
-            field_name = field_details["name"] if field_details else f"Field_{field_id}"
-            response_data["answers"][field_name] = field_response["value"]
-        
-        summary["responses"].append(response_data)
+    if not ObjectId.is_valid(form_id):
+        raise HTTPException(status_code=400, detail="Invalid form ID")
+    if format not in ("csv", "xlsx"):
+        raise HTTPException(status_code=400, detail="Format must be csv or xlsx")
+    
+    form = await db.forms.find_one({"_id": ObjectId(form_id)})
+    if not form:
+        raise HTTPException(status_code=404, detail="Form not found")
+    
+    # Oldest first off the (form_id, submitted_at, _id) index, encoded as the cursor yields
+    columns = export_columns(form)
+    documents = get_read_database("analytics").responses.find(
+        {"form_id": form_id}, {"submitted_at": 1, **ANSWERS_PROJECTION}
+    ).sort([("submitted_at", 1), ("_id", 1)]).batch_size(EXPORT_BATCH_SIZE)
+    
+    if format == "xlsx":
+        headers = {"Content-Disposition": f'attachment; filename="responses-{form_id}.xlsx"'}
+        return StreamingResponse(
+            stream_xlsx(documents, columns),
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers=headers
+        )
     
-    return summary
\ No newline at end of file
+    # XLSX is already a zip; only the CSV is worth gzipping
+    compress = "gzip" in (accept_encoding or "").lower()
+    headers = {"Content-Disposition": f'attachment; filename="responses-{form_id}.csv"', "Vary": "Accept-Encoding"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_csv(documents, columns, compress),
+        media_type="text/csv; charset=utf-8",
+        headers=headers
+    )
+
+
+@router.get("/form/{form_id}/analytics", response_model=ResponseSummary)
+async def get_form_analytics(form_id: str, if_none_match: Optional[str] = Header(None)):
+    db = get_database()
+    
+    if not ObjectId.is_valid(form_id):
+        raise HTTPException(status_code=400, detail="Invalid form ID")
+    
+    form = await db.forms.find_one({"_id": ObjectId(form_id)})
+    if not form:
+        raise HTTPException(status_code=404, detail="Form not found")
+    
+    # Sketches are flushed behind the submissions, so their version is part of the tag
+    sketch_version, sketches = await get_form_sketches(db, form_id)
+    etag = None
+    if ANALYTICS_READS_PRIMARY:
+        etag = combined_etag([form_etag(form), "analytics", str(sketch_version)])
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=cache_headers(etag))
+    
+    # Everything is computed inside Mongo; only the aggregated facets come back
+    field_index = build_field_index(form)
+    pipeline = build_analytics_pipeline(form_id, field_index)
+    result = await get_read_database("analytics").responses.aggregate(pipeline, allowDiskUse=True).to_list(length=1)
+    
+    shaped = shape_analytics(result[0] if result else {}, field_index)
+    for field_id, sketch in sketches.items():
+        if field_id in shaped["field_analytics"]:
+            shaped["field_analytics"][field_id]["sketch"] = sketch
+    analytics = ResponseSummary(**shaped)
+    return _tagged_json(jsonable_encoder(analytics), etag, if_none_match)
+
+
+@router.get("/form/{form_id}/stats")
+async def get_form_response_stats(form_id: str):
+    db = get_database()
+    
+    if not ObjectId.is_valid(form_id):
+        raise HTTPException(status_code=400, detail="Invalid form ID")
+    
+    # Pre-aggregated on submit, so this never touches db.responses
+    stats = await get_form_stats(db, form_id)
+    _, sketches = await get_form_sketches(db, form_id)
+    for field_id, sketch in sketches.items():
+        stats["fields"].setdefault(field_id, {})["sketch"] = sketch
+    return stats
+
+
+def _field_errors(errors: List[FieldError]) -> List[FieldValidationError]:
+    return [FieldValidationError(**error._asdict()) for error in errors]
+
+
+def _tagged_json(content, etag: Optional[str], if_none_match: Optional[str]) -> Response:
+    """JSON response with its ETag; without one, the tag is a hash of the body"""
+    response = JSONResponse(content=content)
+    if etag is None:
+        etag = content_etag(response.body)
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=cache_headers(etag))
+    response.headers.update(cache_headers(etag))
+    return response
+
+
+async def _unstored_positions(db, chunk: List[tuple]) -> dict:
+    """Chunk positions whose documents are not in db.responses, with the error to report"""
+    ids = [document["_id"] for _, document in chunk]
+    try:
+        stored = {document["_id"] async for document in db.responses.find({"_id": {"$in": ids}}, {"_id": 1})}
+    except PyMongoError as e:
+        logger.error(f"Could not check which of {len(chunk)} bulk responses were stored: {e}")
+        return {position: "Write outcome unknown" for position in range(len(chunk))}
+    return {position: "Write failed" for position, (_, document) in enumerate(chunk) if document["_id"] not in stored}
+
+
+def _response_document(response: FormResponseCreate, field_index: dict) -> dict:
+    document = {
+        "form_id": response.form_id,
+        "submitted_at": datetime.utcnow(),
+    }
+    return store_answers(document, response.field_responses, field_index)
+
+
+def _api_response(response: dict) -> dict:
+    """FormResponse fields for a stored response in either answers layout"""
+    return {
+        "id": str(response["_id"]),
+        "form_id": response["form_id"],
+        "submitted_at": response["submitted_at"],
+        "field_responses": answer_pairs(response),
+    }
+
+
+def _summary_row(response: dict, field_index: dict) -> dict:
+    """Map a stored response to a summary row keyed by field name"""
+    return {
+        "response_id": str(response["_id"]),
+        "submitted_at": response["submitted_at"],
+        "answers": {
+            field_name(field_index, field_id): value
+            for field_id, value in response_answers(response).items()
+        }
+    }
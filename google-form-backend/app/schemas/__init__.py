@@ -1,9 +1,15 @@
-from .field import Field, FieldCreate, FieldUpdate, FieldInDB, PyObjectId
-from .form import Form, FormCreate, FormUpdate, FormInDB
-from .response import FormResponse, FormResponseCreate, FormResponseInDB
+from .field import Field, FieldCreate, FieldUpdate, FieldInDB, FieldPage, PyObjectId
+from .form import Form, PublicForm, FormCreate, FormUpdate, FormInDB, FormPage, FormSummary, FormSummaryPage
+from .response import (
+    FormResponse, FormResponseCreate, FormResponseInDB, FormResponsePage,
+    BulkResponseCreate, BulkResponseItem, BulkResponseResult, FieldValidationError,
+    AnswerFilter, ResponseSearch,
+)
 
 __all__ = [
-    "Field", "FieldCreate", "FieldUpdate", "FieldInDB", "PyObjectId",
-    "Form", "FormCreate", "FormUpdate", "FormInDB",
-    "FormResponse", "FormResponseCreate", "FormResponseInDB"
+    "Field", "FieldCreate", "FieldUpdate", "FieldInDB", "FieldPage", "PyObjectId",
+    "Form", "PublicForm", "FormCreate", "FormUpdate", "FormInDB", "FormPage", "FormSummary", "FormSummaryPage",
+    "FormResponse", "FormResponseCreate", "FormResponseInDB", "FormResponsePage",
+    "BulkResponseCreate", "BulkResponseItem", "BulkResponseResult", "FieldValidationError",
+    "AnswerFilter", "ResponseSearch"
 ]
@@ -54,3 +54,7 @@ class Field(FieldBase):
         populate_by_name = True
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
+
+class FieldPage(BaseModel):
+    items: List[Field]
+    next_cursor: Optional[str] = None
@@ -37,18 +37,45 @@ class FormInDB(FormBase):
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
 
-class Form(FormBase):
+class PublicForm(FormBase):
+    """What respondents load by ID or link: no response counters"""
     id: str
     unique_link: str
     is_active: bool
     created_at: datetime
     fields: List[FormFieldInDB] = []
+    updated_at: Optional[datetime] = None
+    version: int = 1
 
     class Config:
         allow_population_by_field_name = True
         arbitrary_types_allowed = True
         json_encoders = {ObjectId: str}
 
+class Form(PublicForm):
+    total_responses: int = 0
+    last_response_at: Optional[datetime] = None
+
+class FormPage(BaseModel):
+    items: List[Form]
+    next_cursor: Optional[str] = None
+
+class FormSummary(BaseModel):
+    """Dashboard listing entry without the embedded fields"""
+    id: str
+    title: str
+    description: Optional[str] = None
+    unique_link: str
+    is_active: bool
+    created_at: datetime
+    total_responses: int = 0
+    last_response_at: Optional[datetime] = None
+    field_count: int = 0
+
+class FormSummaryPage(BaseModel):
+    items: List[FormSummary]
+    next_cursor: Optional[str] = None
+
 # Keep this for backward compatibility if needed elsewhere
 class FormFieldInput(BaseModel):
     field_details: FieldCreate
\ No newline at end of file
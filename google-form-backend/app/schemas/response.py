@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from datetime import datetime
 from app.schemas.field import PyObjectId
 
@@ -16,6 +16,25 @@ class FormResponseBase(BaseModel):
 class FormResponseCreate(FormResponseBase):
     field_responses: List[FieldResponseCreate]
 
+class BulkResponseCreate(BaseModel):
+    responses: List[FormResponseCreate]
+
+class FieldValidationError(BaseModel):
+    field_id: str
+    code: str
+    message: str
+
+class BulkResponseItem(BaseModel):
+    index: int
+    id: Optional[str] = None
+    error: Optional[str] = None
+    errors: Optional[List[FieldValidationError]] = None
+
+class BulkResponseResult(BaseModel):
+    inserted: int
+    failed: int
+    results: List[BulkResponseItem]
+
 class FormResponseInDB(FormResponseBase):
     id: PyObjectId = Field(default_factory=PyObjectId, alias="_id")
     submitted_at: datetime = Field(default_factory=datetime.utcnow)
@@ -34,4 +53,21 @@ class FormResponse(FormResponseBase):
     class Config:
         allow_population_by_field_name = True
         arbitrary_types_allowed = True
-        json_encoders = {PyObjectId: str}
\ No newline at end of file
+        json_encoders = {PyObjectId: str}
+
+class FormResponsePage(BaseModel):
+    items: List[FormResponse]
+    next_cursor: Optional[str] = None
+
+class AnswerFilter(BaseModel):
+    field_id: str
+    op: str = Field("eq", description="eq, in, gt, gte, lt or lte (ranges on number fields only)")
+    value: Optional[Any] = None
+    values: Optional[List[Any]] = None
+
+class ResponseSearch(BaseModel):
+    filters: List[AnswerFilter] = []
+    submitted_after: Optional[datetime] = None
+    submitted_before: Optional[datetime] = None
+    text: Optional[str] = Field(None, description="Words to find in the answers (text index)")
+    text_field_id: Optional[str] = Field(None, description="Only match text within this field's answer")
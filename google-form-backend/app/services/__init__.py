@@ -0,0 +1,40 @@
+# Shared helpers used by the route modules
+from .admission import AdmissionMiddleware, RouteLimiter, admission_stats, limiters, route_class
+from .analytics import build_analytics_pipeline, shape_analytics
+from .answers import RESPONSE_LAYOUT, answer_pairs, encode_answers, response_answers, store_answers, typed_value
+from .etag import cache_headers, combined_etag, etag_matches, form_etag, public_form_etag
+from .fast_json import FAST_JSON_RESPONSES, dumps, trusted_form, trusted_items, trusted_public_form, trusted_response
+from .field_index import build_field_index, field_name
+from .form_cache import (
+    CacheBackend, CachedForm, FormCache, LocalCacheBackend, SharedCacheBackend, create_form_cache, form_cache,
+)
+from .form_stats import get_form_stats, rebuild_form_stats, record_submission, record_submissions
+from .metrics import MetricsMiddleware, MetricsRegistry, registry
+from .pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, decode_cursor, encode_cursor, fetch_page
+from .response_filters import build_response_query
+from .response_migration import migrate_batch, migrate_responses
+from .shared_store import MemoryStore, RedisStore, SharedStore
+from .sketches import (
+    FieldSketch, HyperLogLog, SketchBuffer, SpaceSaving, get_form_sketches, rebuild_form_sketches, sketch_buffer,
+)
+from .submission_buffer import SUBMISSION_BUFFER, BufferFullError, SubmissionBuffer, submission_buffer
+from .validation import FieldError, FormValidator, ValidatorCache, validator_cache
+
+__all__ = [
+    "AdmissionMiddleware", "RouteLimiter", "admission_stats", "limiters", "route_class",
+    "build_analytics_pipeline", "shape_analytics",
+    "RESPONSE_LAYOUT", "answer_pairs", "encode_answers", "response_answers", "store_answers", "typed_value",
+    "cache_headers", "combined_etag", "etag_matches", "form_etag", "public_form_etag",
+    "FAST_JSON_RESPONSES", "dumps", "trusted_form", "trusted_items", "trusted_public_form", "trusted_response",
+    "build_field_index", "field_name",
+    "CacheBackend", "CachedForm", "FormCache", "LocalCacheBackend", "SharedCacheBackend", "create_form_cache", "form_cache",
+    "get_form_stats", "rebuild_form_stats", "record_submission", "record_submissions",
+    "MetricsMiddleware", "MetricsRegistry", "registry",
+    "DEFAULT_PAGE_SIZE", "MAX_PAGE_SIZE", "decode_cursor", "encode_cursor", "fetch_page",
+    "build_response_query",
+    "migrate_batch", "migrate_responses",
+    "MemoryStore", "RedisStore", "SharedStore",
+    "FieldSketch", "HyperLogLog", "SketchBuffer", "SpaceSaving", "get_form_sketches", "rebuild_form_sketches", "sketch_buffer",
+    "SUBMISSION_BUFFER", "BufferFullError", "SubmissionBuffer", "submission_buffer",
+    "FieldError", "FormValidator", "ValidatorCache", "validator_cache",
+]
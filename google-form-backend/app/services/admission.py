@@ -0,0 +1,191 @@
+"""Admission control for the routes that compete for the event loop and Mongo pool.
+
+Requests are sorted into route classes (submissions, public form loads and
+analytics, summary, export and search reads). Each class has its own concurrency limit and a
+bounded FIFO wait queue. A request that finds the queue full, or waits longer
+than ADMISSION_QUEUE_TIMEOUT_MS, is shed with 503 and Retry-After. A burst of
+expensive admin reads then queues behind its own limit instead of slowing
+down submissions and form loads.
+"""
+from collections import deque
+from typing import Deque, Dict, List, Optional
+import asyncio
+import os
+import re
+import time
+
+from fastapi.responses import JSONResponse
+
+from app.services.metrics import registry
+
+ADMISSION_CONTROL = os.getenv("ADMISSION_CONTROL", "true").lower() in ("1", "true", "yes")
+ADMISSION_QUEUE_TIMEOUT_MS = int(os.getenv("ADMISSION_QUEUE_TIMEOUT_MS", 5000))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", 1))
+
+# (class, method, path pattern); the first match wins and unmatched requests are never limited
+ROUTE_CLASSES = (
+    ("submit", "POST", re.compile(r"^/api/v1/responses/(bulk)?$")),
+    ("public", "GET", re.compile(r"^/api/v1/forms/(link/[^/]+|[0-9a-fA-F]{24})$")),
+    ("analytics", "GET", re.compile(r"^/api/v1/responses/form/[^/]+/(summary|analytics|stats|export)$")),
+    ("analytics", "POST", re.compile(r"^/api/v1/responses/form/[^/]+/search$")),
+)
+
+DEFAULT_LIMITS = {
+    "submit": (64, 256),
+    "public": (128, 512),
+    "analytics": (8, 32),
+}
+
+
+class RouteLimiter:
+    """Concurrency limit with a bounded FIFO queue; slots are handed straight to the next waiter"""
+
+    def __init__(self, name: str, concurrency: int, queue_size: int, timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self.admitted = 0
+        self.shed_queue_full = 0
+        self.shed_timeout = 0
+        self.wait_seconds = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """Take a slot, waiting in line if needed; False means the request should be shed"""
+        if self.in_flight < self.concurrency and not self._waiters:
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+        if len(self._waiters) >= self.queue_size:
+            self.shed_queue_full += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(waiter, self.timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            elif waiter.done() and not waiter.cancelled():
+                # The slot arrived just as we gave up; pass it on
+                self.release()
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.shed_timeout += 1
+            return False
+        finally:
+            self.wait_seconds += time.perf_counter() - started
+
+        self.admitted += 1
+        return True
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queue_size": self.queue_size,
+            "in_flight": self.in_flight,
+            "queue_depth": self.queue_depth,
+            "admitted": self.admitted,
+            "shed_queue_full": self.shed_queue_full,
+            "shed_timeout": self.shed_timeout,
+            "wait_seconds": round(self.wait_seconds, 3),
+        }
+
+
+def _limiter(name: str) -> RouteLimiter:
+    concurrency, queue_size = DEFAULT_LIMITS[name]
+    return RouteLimiter(
+        name,
+        concurrency=int(os.getenv(f"ADMISSION_{name.upper()}_CONCURRENCY", concurrency)),
+        queue_size=int(os.getenv(f"ADMISSION_{name.upper()}_QUEUE", queue_size)),
+        timeout=ADMISSION_QUEUE_TIMEOUT_MS / 1000,
+    )
+
+
+limiters: Dict[str, RouteLimiter] = {name: _limiter(name) for name in DEFAULT_LIMITS}
+
+
+def route_class(method: str, path: str) -> Optional[str]:
+    for name, route_method, pattern in ROUTE_CLASSES:
+        if method == route_method and pattern.match(path):
+            return name
+    return None
+
+
+def admission_stats() -> dict:
+    return {"enabled": ADMISSION_CONTROL, **{name: limiter.stats() for name, limiter in limiters.items()}}
+
+
+def admission_metric_lines() -> List[str]:
+    lines = [
+        "# HELP admission_in_flight Requests holding an admission slot, by route class.",
+        "# TYPE admission_in_flight gauge",
+        *(f'admission_in_flight{{class="{name}"}} {limiter.in_flight}' for name, limiter in limiters.items()),
+        "# HELP admission_queue_depth Requests waiting for an admission slot, by route class.",
+        "# TYPE admission_queue_depth gauge",
+        *(f'admission_queue_depth{{class="{name}"}} {limiter.queue_depth}' for name, limiter in limiters.items()),
+        "# HELP admission_concurrency_limit Configured concurrent requests per route class.",
+        "# TYPE admission_concurrency_limit gauge",
+        *(f'admission_concurrency_limit{{class="{name}"}} {limiter.concurrency}' for name, limiter in limiters.items()),
+        "# HELP admission_requests_total Admission decisions by route class and outcome.",
+        "# TYPE admission_requests_total counter",
+    ]
+    for name, limiter in limiters.items():
+        lines.append(f'admission_requests_total{{class="{name}",outcome="admitted"}} {limiter.admitted}')
+        lines.append(f'admission_requests_total{{class="{name}",outcome="shed_queue_full"}} {limiter.shed_queue_full}')
+        lines.append(f'admission_requests_total{{class="{name}",outcome="shed_timeout"}} {limiter.shed_timeout}')
+    lines.extend([
+        "# HELP admission_queue_wait_seconds_total Time spent waiting for an admission slot.",
+        "# TYPE admission_queue_wait_seconds_total counter",
+        *(f'admission_queue_wait_seconds_total{{class="{name}"}} {limiter.wait_seconds}' for name, limiter in limiters.items()),
+    ])
+    return lines
+
+
+registry.add_collector(admission_metric_lines)
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware so a slot is held until a streamed response is fully sent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        name = route_class(scope["method"], scope["path"]) if scope["type"] == "http" and ADMISSION_CONTROL else None
+        if name is None:
+            await self.app(scope, receive, send)
+            return
+
+        limiter = limiters[name]
+        if not await limiter.acquire():
+            # The router never sees a shed request; this is what the metrics label it with
+            scope["admission_class"] = name
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy, try again shortly"},
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER_SECONDS)},
+            )
+            await response(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
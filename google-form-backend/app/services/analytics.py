@@ -0,0 +1,144 @@
+from typing import Dict, Any, List
+import os
+
+HISTOGRAM_BUCKETS = int(os.getenv("ANALYTICS_HISTOGRAM_BUCKETS", 10))
+
+
+def _unwind_answers(field_ids: List[str]) -> List[dict]:
+    """Stages emitting one document per answer to one of the given fields"""
+    return [
+        # Answers-keyed documents are turned back into {field_id, value} pairs
+        {"$set": {"field_responses": {"$ifNull": ["$field_responses", {"$map": {
+            "input": {"$objectToArray": {"$ifNull": ["$answers", {}]}},
+            "in": {"field_id": "$$this.k", "value": "$$this.v"},
+        }}]}}},
+        {"$unwind": "$field_responses"},
+        {"$match": {"field_responses.field_id": {"$in": field_ids}}},
+    ]
+
+
+def _numeric_answers(field_ids: List[str]) -> List[dict]:
+    """Stages emitting {field_id, num} for answers that parse as numbers"""
+    return _unwind_answers(field_ids) + [
+        {"$project": {
+            "field_id": "$field_responses.field_id",
+            "num": {"$convert": {
+                "input": "$field_responses.value",
+                "to": "double",
+                "onError": None,
+                "onNull": None,
+            }},
+        }},
+        {"$match": {"num": {"$ne": None}}},
+    ]
+
+
+def build_analytics_pipeline(form_id: str, field_index: Dict[str, Dict[str, Any]]) -> List[dict]:
+    """Aggregation computing totals, per-field stats and submission trends in one pass"""
+    choice_ids = [fid for fid, details in field_index.items() if details.get("field_type") == "single_choice"]
+    number_ids = [fid for fid, details in field_index.items() if details.get("field_type") == "number"]
+
+    facets = {
+        "totals": [
+            {"$group": {
+                "_id": None,
+                "total": {"$sum": 1},
+                "complete": {"$sum": {"$cond": [{"$ifNull": ["$is_complete", True]}, 1, 0]}},
+                "average_completion_time": {"$avg": "$metadata.completion_time_seconds"},
+                "last_response_at": {"$max": "$submitted_at"},
+            }},
+        ],
+        "answered": _unwind_answers(list(field_index)) + [
+            {"$group": {"_id": "$field_responses.field_id", "count": {"$sum": 1}}},
+        ],
+        "daily": [
+            {"$group": {
+                "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$submitted_at"}},
+                "count": {"$sum": 1},
+            }},
+            {"$sort": {"_id": 1}},
+        ],
+        "hourly": [
+            {"$group": {"_id": {"$hour": "$submitted_at"}, "count": {"$sum": 1}}},
+            {"$sort": {"_id": 1}},
+        ],
+    }
+
+    if choice_ids:
+        facets["choices"] = _unwind_answers(choice_ids) + [
+            {"$group": {
+                "_id": {"field_id": "$field_responses.field_id", "value": "$field_responses.value"},
+                "count": {"$sum": 1},
+            }},
+        ]
+
+    if number_ids:
+        facets["numbers"] = _numeric_answers(number_ids) + [
+            {"$group": {
+                "_id": "$field_id",
+                "count": {"$sum": 1},
+                "sum": {"$sum": "$num"},
+                "min": {"$min": "$num"},
+                "max": {"$max": "$num"},
+                "mean": {"$avg": "$num"},
+            }},
+        ]
+        # $bucketAuto has no group key, so each number field gets its own facet
+        for index, field_id in enumerate(number_ids):
+            facets[f"histogram_{index}"] = _numeric_answers([field_id]) + [
+                {"$bucketAuto": {"groupBy": "$num", "buckets": HISTOGRAM_BUCKETS}},
+            ]
+
+    return [
+        {"$match": {"form_id": form_id}},
+        {"$facet": facets},
+    ]
+
+
+def shape_analytics(result: dict, field_index: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Turn the $facet output into the ResponseSummary layout"""
+    totals = result["totals"][0] if result.get("totals") else {}
+    total = totals.get("total", 0)
+    answered = {row["_id"]: row["count"] for row in result.get("answered", [])}
+
+    field_analytics = {}
+    for position, (field_id, details) in enumerate(field_index.items()):
+        field_analytics[field_id] = {
+            "name": details.get("name", f"Field_{field_id}"),
+            "field_type": details.get("field_type"),
+            "position": position,
+            "answered": answered.get(field_id, 0),
+        }
+        if details.get("field_type") == "single_choice":
+            # Declared options always show up, even with zero votes
+            field_analytics[field_id]["option_counts"] = {option: 0 for option in details.get("options") or []}
+
+    for row in result.get("choices", []):
+        counts = field_analytics[row["_id"]["field_id"]]["option_counts"]
+        counts[row["_id"]["value"]] = row["count"]
+
+    number_ids = [fid for fid, details in field_index.items() if details.get("field_type") == "number"]
+    numbers = {row["_id"]: row for row in result.get("numbers", [])}
+    for index, field_id in enumerate(number_ids):
+        stats = numbers.get(field_id, {})
+        field_analytics[field_id].update({
+            "count": stats.get("count", 0),
+            "min": stats.get("min"),
+            "max": stats.get("max"),
+            "mean": stats.get("mean"),
+            "histogram": [
+                {"min": bucket["_id"]["min"], "max": bucket["_id"]["max"], "count": bucket["count"]}
+                for bucket in result.get(f"histogram_{index}", [])
+            ],
+        })
+
+    return {
+        "total_responses": total,
+        "completion_rate": totals.get("complete", 0) / total if total else 0.0,
+        "average_completion_time": totals.get("average_completion_time"),
+        "field_analytics": field_analytics,
+        "response_trends": {
+            "daily": [{"date": row["_id"], "count": row["count"]} for row in result.get("daily", [])],
+            "hourly": [{"hour": row["_id"], "count": row["count"]} for row in result.get("hourly", [])],
+        },
+    }
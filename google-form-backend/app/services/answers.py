@@ -0,0 +1,82 @@
+"""Storage layout of the answers in a responses document.
+
+Responses used to keep answers as a list of {field_id, value} pairs with
+every value a string. They are now stored as an ``answers`` sub-document
+keyed by field_id, with number answers stored as numbers, so one question's
+answer can be read, indexed and queried directly:
+
+    {"form_id": ..., "submitted_at": ..., "answers": {"<field_id>": 42, ...}}
+
+Until app.services.response_migration has rewritten the old documents,
+readers go through response_answers() / answer_pairs(), which accept either
+layout. RESPONSE_LAYOUT=list keeps writing the old layout while instances
+that can't read the new one are still being replaced.
+"""
+from typing import Any, Dict, Iterable, List
+import math
+import os
+
+RESPONSE_LAYOUT = os.getenv("RESPONSE_LAYOUT", "keyed")
+
+# Largest integer a double (and so every Mongo driver) represents exactly
+_MAX_SAFE_INTEGER = 2 ** 53
+
+
+def typed_value(value: Any, field_type: str = None) -> Any:
+    """Store number answers as int or float; everything else as given"""
+    if field_type != "number" or not isinstance(value, str) or not value.strip():
+        return value
+    try:
+        number = float(value)
+    except ValueError:
+        return value
+    if not math.isfinite(number):
+        return value
+    if number.is_integer() and abs(number) < _MAX_SAFE_INTEGER:
+        return int(number)
+    return number
+
+
+def encode_answers(field_responses: Iterable[Any], field_index: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """Answers sub-document from submitted field responses (objects or dicts with field_id/value)"""
+    answers = {}
+    for field_response in field_responses:
+        if isinstance(field_response, dict):
+            field_id, value = field_response["field_id"], field_response["value"]
+        else:
+            field_id, value = field_response.field_id, field_response.value
+        answers[field_id] = typed_value(value, field_index.get(field_id, {}).get("field_type"))
+    return answers
+
+
+def store_answers(document: dict, field_responses: Iterable[Any], field_index: Dict[str, Dict[str, Any]]) -> dict:
+    """Put the answers on a new responses document in the configured layout"""
+    if RESPONSE_LAYOUT == "list":
+        document["field_responses"] = [
+            {"field_id": field_response.field_id, "value": field_response.value}
+            for field_response in field_responses
+        ]
+    else:
+        document["answers"] = encode_answers(field_responses, field_index)
+    return document
+
+
+def response_answers(document: dict) -> Dict[str, Any]:
+    """field_id -> value for a stored response in either layout"""
+    if "answers" in document:
+        return document["answers"]
+    return {
+        field_response["field_id"]: field_response["value"]
+        for field_response in document.get("field_responses") or []
+    }
+
+
+def answer_pairs(document: dict) -> List[Dict[str, Any]]:
+    """The API's field_responses list for a stored response in either layout"""
+    if "answers" in document:
+        return [{"field_id": field_id, "value": value} for field_id, value in document["answers"].items()]
+    return document.get("field_responses") or []
+
+
+# Projection for reading the answers of either layout
+ANSWERS_PROJECTION = {"answers": 1, "field_responses": 1}
@@ -0,0 +1,59 @@
+from typing import Iterable, Optional
+import hashlib
+import os
+
+# Sent with every ETag'd response; "no-cache" lets browsers keep a copy but revalidate it
+CACHE_CONTROL = os.getenv("CACHE_CONTROL", "no-cache")
+
+
+def _form_version(form: dict) -> int:
+    """The version bumped by every update_form; documents written before versioning use their timestamp"""
+    version = form.get("version")
+    if version is None:
+        stamp = form.get("updated_at") or form.get("created_at")
+        version = int(stamp.timestamp() * 1000) if stamp else 0
+    return version
+
+
+def form_etag(form: dict) -> str:
+    """Strong ETag for a form document with its response counter, as the admin views show it"""
+    form_id = form.get("id") or form.get("_id")
+    return f'"{form_id}-v{_form_version(form)}-r{form.get("total_responses", 0)}"'
+
+
+def public_form_etag(form: dict) -> str:
+    """Strong ETag for the form respondents load; only an edit changes it, not a submission"""
+    form_id = form.get("id") or form.get("_id")
+    return f'"{form_id}-v{_form_version(form)}"'
+
+
+def combined_etag(parts: Iterable[str]) -> str:
+    """Strong ETag for a payload made of several tagged parts"""
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\n")
+    return f'"{digest.hexdigest()}"'
+
+
+def content_etag(content: bytes) -> str:
+    """Strong ETag from the response body itself, for payloads with no version to tag them by"""
+    return f'"{hashlib.sha1(content).hexdigest()}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers the given ETag"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate == etag:
+            return True
+        # Weak comparison is what RFC 9110 asks for on If-None-Match
+        if candidate.startswith("W/") and candidate[2:] == etag:
+            return True
+    return False
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": CACHE_CONTROL}
@@ -0,0 +1,244 @@
+"""Streaming spreadsheet export of a form's responses.
+
+Rows are encoded as the Motor cursor yields them and handed to the response
+in chunks of about EXPORT_CHUNK_BYTES, so memory stays flat whatever the
+number of responses. CSV can be gzip-compressed on the fly. XLSX is written
+as a streamed zip: each sheet is deflated while it is generated, and the
+workbook parts that list the sheets are added once the row count is known.
+Excel caps a sheet at 1,048,576 rows, so large exports roll over to more
+sheets.
+"""
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
+from xml.sax.saxutils import escape
+import csv
+import io
+import math
+import os
+import re
+import zipfile
+import zlib
+
+from app.services.answers import response_answers
+
+EXPORT_CHUNK_BYTES = int(os.getenv("EXPORT_CHUNK_BYTES", 64 * 1024))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+
+XLSX_MAX_ROWS = 1_048_576
+
+# Characters XML 1.0 doesn't allow, even escaped
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f\ufffe\uffff]")
+
+Column = Tuple[str, str, Optional[str]]  # (field_id, header, field_type)
+
+# Leading characters that make Excel and Sheets read a text cell as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def export_columns(form: dict) -> List[Column]:
+    """Answer columns in the form's field order, headed by field name"""
+    fields = sorted(
+        enumerate(form.get("fields", [])),
+        key=lambda item: (item[1].get("position", item[0]), item[0])
+    )
+    columns = []
+    for _, form_field in fields:
+        details = form_field.get("field_details") or {}
+        field_id = form_field["field_id"]
+        columns.append((field_id, details.get("name") or f"Field_{field_id}", details.get("field_type")))
+    return columns
+
+
+def _finite_number(value: Any) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def _safe_text(value: Any, numeric: bool = False) -> Any:
+    """Quote text that a spreadsheet would evaluate; real numbers in number fields pass through"""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        if not (numeric and _finite_number(value) is not None):
+            return "'" + value
+    return value
+
+
+def export_row(response: dict, columns: List[Column]) -> List[Any]:
+    answers = response_answers(response)
+    return [
+        str(response["_id"]),
+        response["submitted_at"].isoformat(),
+        *(_safe_text(answers.get(field_id, ""), field_type == "number") for field_id, _, field_type in columns),
+    ]
+
+
+def export_header(columns: List[Column]) -> List[str]:
+    return ["response_id", "submitted_at", *(_safe_text(header) for _, header, _ in columns)]
+
+
+async def stream_csv(documents: AsyncIterator[dict], columns: List[Column],
+                     compress: bool = False) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # wbits=31 writes a gzip header and trailer around the deflate stream
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def drain() -> bytes:
+        data = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    # BOM so Excel opens the file as UTF-8
+    buffer.write("\ufeff")
+    writer.writerow(export_header(columns))
+    async for response in documents:
+        writer.writerow(export_row(response, columns))
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            chunk = drain()
+            if chunk:
+                yield chunk
+
+    tail = drain()
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
+
+
+class _ChunkSink:
+    """Write-only file for zipfile; with no tell() zipfile streams with data descriptors"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        self.size = 0
+        return data
+
+
+def _cell(reference: str, value: Any, numeric: bool) -> str:
+    if numeric and value != "":
+        number = _finite_number(value)
+        if number is not None:
+            return f'<c r="{reference}"><v>{number!r}</v></c>'
+    text = _INVALID_XML.sub("", str(value))
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{escape(text)}</t></is></c>'
+
+
+def _column_letters(count: int) -> List[str]:
+    letters = []
+    for index in range(count):
+        name = ""
+        index += 1
+        while index:
+            index, remainder = divmod(index - 1, 26)
+            name = chr(65 + remainder) + name
+        letters.append(name)
+    return letters
+
+
+def _xml_row(row_number: int, values: Iterable[Any], letters: List[str], numeric: List[bool]) -> str:
+    cells = "".join(
+        _cell(f"{letter}{row_number}", value, is_numeric)
+        for letter, value, is_numeric in zip(letters, values, numeric)
+    )
+    return f'<row r="{row_number}">{cells}</row>'
+
+
+_SHEET_START = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_END = "</sheetData></worksheet>"
+
+
+def _workbook_parts(sheet_count: int) -> Dict[str, str]:
+    sheets = range(1, sheet_count + 1)
+    return {
+        "xl/workbook.xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            + "".join(f'<sheet name="Responses{"" if i == 1 else f" {i}"}" sheetId="{i}" r:id="rId{i}"/>' for i in sheets)
+            + "</sheets></workbook>"
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            + "".join(
+                f'<Relationship Id="rId{i}" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+                f'Target="worksheets/sheet{i}.xml"/>' for i in sheets
+            )
+            + "</Relationships>"
+        ),
+        "_rels/.rels": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ),
+        "[Content_Types].xml": (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            + "".join(
+                f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+                'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>' for i in sheets
+            )
+            + "</Types>"
+        ),
+    }
+
+
+async def stream_xlsx(documents: AsyncIterator[dict], columns: List[Column]) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    archive = zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED)
+    header = export_header(columns)
+    letters = _column_letters(len(header))
+    # response_id and submitted_at are text; number fields become numeric cells
+    numeric = [False, False, *(field_type == "number" for _, _, field_type in columns)]
+    header_numeric = [False] * len(header)
+
+    sheet_count = 1
+    sheet = archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+    sheet.write(_SHEET_START.encode("utf-8"))
+    sheet.write(_xml_row(1, header, letters, header_numeric).encode("utf-8"))
+    row_number = 1
+
+    async for response in documents:
+        if row_number == XLSX_MAX_ROWS:
+            sheet.write(_SHEET_END.encode("utf-8"))
+            sheet.close()
+            sheet_count += 1
+            sheet = archive.open(f"xl/worksheets/sheet{sheet_count}.xml", "w", force_zip64=True)
+            sheet.write(_SHEET_START.encode("utf-8"))
+            sheet.write(_xml_row(1, header, letters, header_numeric).encode("utf-8"))
+            row_number = 1
+
+        row_number += 1
+        sheet.write(_xml_row(row_number, export_row(response, columns), letters, numeric).encode("utf-8"))
+        if sink.size >= EXPORT_CHUNK_BYTES:
+            yield sink.take()
+
+    sheet.write(_SHEET_END.encode("utf-8"))
+    sheet.close()
+    for name, content in _workbook_parts(sheet_count).items():
+        archive.writestr(name, content)
+    archive.close()
+    yield sink.take()
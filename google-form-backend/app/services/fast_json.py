@@ -0,0 +1,91 @@
+"""Opt-in serialization path for trusted database documents.
+
+Documents read back from Mongo were validated when they were written, so the
+list routes can reshape them into the API layout directly and encode them in
+one step, instead of building a Pydantic model and then having FastAPI
+validate and encode it again. orjson is used when installed.
+"""
+from typing import Any, Callable, Dict, Iterable, List
+import json
+import logging
+import os
+
+from bson import ObjectId
+
+from app.services.answers import answer_pairs
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+FAST_JSON_RESPONSES = os.getenv("FAST_JSON_RESPONSES", "false").lower() in ("1", "true", "yes")
+
+
+def _default(value: Any):
+    if isinstance(value, ObjectId):
+        return str(value)
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """Encode API content to JSON bytes, handling ObjectId and datetime"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default)
+    return json.dumps(content, default=_default, separators=(",", ":")).encode("utf-8")
+
+
+def trusted_public_form(form: dict) -> Dict[str, Any]:
+    """Shape a forms document like the PublicForm schema without validating it"""
+    return {
+        "title": form["title"],
+        "description": form.get("description"),
+        "id": str(form["_id"]),
+        "unique_link": form["unique_link"],
+        "is_active": form.get("is_active", True),
+        "created_at": form["created_at"],
+        "fields": [
+            {
+                "field_id": form_field["field_id"],
+                "position": form_field["position"],
+                "field_details": form_field["field_details"],
+            }
+            for form_field in form.get("fields", [])
+        ],
+        "updated_at": form.get("updated_at"),
+        "version": form.get("version", 1),
+    }
+
+
+def trusted_form(form: dict) -> Dict[str, Any]:
+    """Shape a forms document like the Form schema without validating it"""
+    return {
+        **trusted_public_form(form),
+        "total_responses": form.get("total_responses", 0),
+        "last_response_at": form.get("last_response_at"),
+    }
+
+
+def trusted_response(response: dict) -> Dict[str, Any]:
+    """Shape a responses document like the FormResponse schema without validating it"""
+    return {
+        "form_id": response["form_id"],
+        "id": str(response["_id"]),
+        "submitted_at": response["submitted_at"],
+        "field_responses": answer_pairs(response),
+    }
+
+
+def trusted_items(shape: Callable[[dict], Dict[str, Any]], documents: Iterable[dict], kind: str) -> List[Dict[str, Any]]:
+    """Shape each document, skipping malformed ones as the validated path does"""
+    items = []
+    for document in documents:
+        try:
+            items.append(shape(document))
+        except (KeyError, TypeError, AttributeError) as e:
+            logger.warning(f"Skipping malformed {kind} document {document.get('_id')}: {e!r}")
+    return items
@@ -0,0 +1,17 @@
+from typing import Dict, Any
+
+
+def build_field_index(form: dict) -> Dict[str, Dict[str, Any]]:
+    """Map each field_id of a form document to its embedded field details"""
+    return {
+        form_field["field_id"]: form_field.get("field_details") or {}
+        for form_field in form.get("fields", [])
+    }
+
+
+def field_name(field_index: Dict[str, Dict[str, Any]], field_id: str) -> str:
+    """Field label for an answer, falling back to the raw ID for unknown fields"""
+    field_details = field_index.get(field_id)
+    if field_details and "name" in field_details:
+        return field_details["name"]
+    return f"Field_{field_id}"
@@ -0,0 +1,290 @@
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Set, Tuple
+import asyncio
+import logging
+import os
+import time
+
+from app.services.shared_store import MemoryStore, RedisStore, SharedStore
+
+logger = logging.getLogger(__name__)
+
+# "local" (per process), "redis" (shared across workers) or "memory" (Redis stand-in)
+FORM_CACHE_BACKEND = os.getenv("FORM_CACHE_BACKEND", "local")
+FORM_CACHE_MAX_ENTRIES = int(os.getenv("FORM_CACHE_MAX_ENTRIES", 1024))
+FORM_CACHE_TTL_SECONDS = float(os.getenv("FORM_CACHE_TTL_SECONDS", 60))
+# Per-worker copy kept in front of the shared store; bounds staleness if a broadcast is lost
+FORM_CACHE_LOCAL_TTL_SECONDS = float(os.getenv("FORM_CACHE_LOCAL_TTL_SECONDS", 5))
+# After an invalidation, refuse fills for this long; a fill may carry a form read before the edit
+FORM_CACHE_TOMBSTONE_SECONDS = float(os.getenv("FORM_CACHE_TOMBSTONE_SECONDS", 5))
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+INVALIDATION_CHANNEL = "formcache:invalidate"
+
+
+class CachedForm(NamedTuple):
+    """Serialized form payload together with the ETag it was built for"""
+    etag: str
+    payload: bytes
+
+
+class FormCache:
+    """Bounded LRU cache with TTL holding serialized form payloads and their ETags.
+
+    Entries are stored under both ("id", form_id) and ("link", unique_link) so
+    either lookup can hit, and invalidating a form drops every key it owns.
+    An invalidated form is not cached again for tombstone_ttl seconds, so a
+    request that read the form just before an edit can't put it back.
+    """
+
+    def __init__(self, max_entries: int = FORM_CACHE_MAX_ENTRIES, ttl: float = FORM_CACHE_TTL_SECONDS,
+                 tombstone_ttl: float = FORM_CACHE_TOMBSTONE_SECONDS):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tombstone_ttl = tombstone_ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, str, CachedForm]]" = OrderedDict()
+        self._keys_by_form: Dict[str, Set[Tuple[str, str]]] = {}
+        # form_id -> until when fills are refused, oldest first
+        self._tombstones: "OrderedDict[str, float]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, kind: str, key: str) -> Optional[CachedForm]:
+        entry = self._entries.get((kind, key))
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, form_id, cached = entry
+        if expires_at < time.monotonic():
+            self._drop((kind, key), form_id)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end((kind, key))
+        self.hits += 1
+        return cached
+
+    def set(self, form_id: str, unique_link: str, cached: CachedForm):
+        now = time.monotonic()
+        if self._tombstones.get(form_id, 0) > now:
+            return
+        expires_at = now + self.ttl
+        for cache_key in (("id", form_id), ("link", unique_link)):
+            self._entries[cache_key] = (expires_at, form_id, cached)
+            self._entries.move_to_end(cache_key)
+            self._keys_by_form.setdefault(form_id, set()).add(cache_key)
+
+        while len(self._entries) > self.max_entries:
+            cache_key, (_, owner, _) = next(iter(self._entries.items()))
+            self._drop(cache_key, owner)
+            self.evictions += 1
+
+    def invalidate(self, form_id: str):
+        for cache_key in self._keys_by_form.pop(form_id, set()):
+            self._entries.pop(cache_key, None)
+
+        now = time.monotonic()
+        self._tombstones.pop(form_id, None)
+        self._tombstones[form_id] = now + self.tombstone_ttl
+        while self._tombstones and next(iter(self._tombstones.values())) <= now:
+            self._tombstones.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_form.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+    def _drop(self, cache_key: Tuple[str, str], form_id: str):
+        self._entries.pop(cache_key, None)
+        keys = self._keys_by_form.get(form_id)
+        if keys is not None:
+            keys.discard(cache_key)
+            if not keys:
+                del self._keys_by_form[form_id]
+
+
+class CacheBackend:
+    """Interface the form routes use to cache serialized form payloads"""
+
+    name = "base"
+
+    async def get(self, kind: str, key: str) -> Optional[CachedForm]:
+        raise NotImplementedError
+
+    async def set(self, form_id: str, unique_link: str, cached: CachedForm):
+        raise NotImplementedError
+
+    async def invalidate(self, form_id: str):
+        raise NotImplementedError
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+
+class LocalCacheBackend(CacheBackend):
+    """Per-process cache; only safe with a single worker"""
+
+    name = "local"
+
+    def __init__(self, cache: Optional[FormCache] = None):
+        self.cache = cache or FormCache()
+
+    async def get(self, kind: str, key: str) -> Optional[CachedForm]:
+        return self.cache.get(kind, key)
+
+    async def set(self, form_id: str, unique_link: str, cached: CachedForm):
+        self.cache.set(form_id, unique_link, cached)
+
+    async def invalidate(self, form_id: str):
+        self.cache.invalidate(form_id)
+
+    def stats(self) -> dict:
+        return {"backend": self.name, **self.cache.stats()}
+
+
+class SharedCacheBackend(CacheBackend):
+    """Cache shared by all workers through a SharedStore.
+
+    Each worker keeps a short-lived local copy in front of the store.
+    Invalidations delete the shared keys and are broadcast on a channel, so
+    every worker drops its local copy as soon as the message arrives and at
+    the latest after FORM_CACHE_LOCAL_TTL_SECONDS.
+
+    An invalidation also leaves a tombstone key for
+    FORM_CACHE_TOMBSTONE_SECONDS. A fill checks for it after writing and
+    deletes its own keys if one is there, so a worker that read the form
+    before the edit can't keep the old version in the store.
+    """
+
+    name = "shared"
+
+    def __init__(self, store: SharedStore, ttl: float = FORM_CACHE_TTL_SECONDS,
+                 local_ttl: float = FORM_CACHE_LOCAL_TTL_SECONDS,
+                 tombstone_ttl: float = FORM_CACHE_TOMBSTONE_SECONDS):
+        self.store = store
+        self.ttl = ttl
+        self.tombstone_ttl = tombstone_ttl
+        self.local = FormCache(ttl=local_ttl, tombstone_ttl=tombstone_ttl)
+        self.store_errors = 0
+        self.invalidations_received = 0
+        self._listener: Optional[asyncio.Task] = None
+
+    async def get(self, kind: str, key: str) -> Optional[CachedForm]:
+        cached = self.local.get(kind, key)
+        if cached is not None:
+            return cached
+
+        try:
+            entry = await self.store.get(f"formcache:{kind}:{key}")
+        except Exception as e:
+            self.store_errors += 1
+            logger.warning(f"Shared form cache read failed: {e}")
+            return None
+        if entry is None:
+            return None
+
+        # Shared entries carry their owner so the local copy can be invalidated by form ID
+        form_id, unique_link, etag, payload = entry.split(b"\n", 3)
+        cached = CachedForm(etag.decode(), payload)
+        self.local.set(form_id.decode(), unique_link.decode(), cached)
+        return cached
+
+    async def set(self, form_id: str, unique_link: str, cached: CachedForm):
+        self.local.set(form_id, unique_link, cached)
+        entry = f"{form_id}\n{unique_link}\n{cached.etag}\n".encode("utf-8") + cached.payload
+        keys = [f"formcache:id:{form_id}", f"formcache:link:{unique_link}", f"formcache:owner:{form_id}"]
+        try:
+            if await self.store.get(f"formcache:tombstone:{form_id}") is not None:
+                self.local.invalidate(form_id)
+                return
+            await self.store.set(keys[0], entry, self.ttl)
+            await self.store.set(keys[1], entry, self.ttl)
+            await self.store.set(keys[2], unique_link.encode("utf-8"), self.ttl)
+            # An invalidation between the check and the writes has left its tombstone; undo what we wrote
+            if await self.store.get(f"formcache:tombstone:{form_id}") is not None:
+                self.local.invalidate(form_id)
+                await self.store.delete(*keys)
+        except Exception as e:
+            self.store_errors += 1
+            logger.warning(f"Shared form cache write failed: {e}")
+
+    async def invalidate(self, form_id: str):
+        self.local.invalidate(form_id)
+        try:
+            # Tombstone first: a fill that writes after our delete will find it
+            await self.store.set(f"formcache:tombstone:{form_id}", b"1", self.tombstone_ttl)
+            unique_link = await self.store.get(f"formcache:owner:{form_id}")
+            keys = [f"formcache:id:{form_id}", f"formcache:owner:{form_id}"]
+            if unique_link is not None:
+                keys.append(f"formcache:link:{unique_link.decode()}")
+            await self.store.delete(*keys)
+            await self.store.publish(INVALIDATION_CHANNEL, form_id)
+        except Exception as e:
+            self.store_errors += 1
+            logger.warning(f"Shared form cache invalidation failed: {e}")
+
+    async def start(self):
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self.store.close()
+
+    async def _listen(self):
+        while True:
+            try:
+                async for form_id in self.store.listen(INVALIDATION_CHANNEL):
+                    self.invalidations_received += 1
+                    self.local.invalidate(form_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Local copies still expire on their own TTL while we reconnect
+                self.store_errors += 1
+                logger.warning(f"Form cache invalidation listener failed, retrying: {e}")
+                self.local.clear()
+                await asyncio.sleep(1)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.name,
+            "local": self.local.stats(),
+            "store_errors": self.store_errors,
+            "invalidations_received": self.invalidations_received,
+        }
+
+
+def create_form_cache(backend: str = FORM_CACHE_BACKEND) -> CacheBackend:
+    if backend == "local":
+        return LocalCacheBackend()
+    if backend == "redis":
+        return SharedCacheBackend(RedisStore(REDIS_URL))
+    if backend == "memory":
+        return SharedCacheBackend(MemoryStore())
+    raise ValueError(f"Unknown FORM_CACHE_BACKEND: {backend}")
+
+
+form_cache = create_form_cache()
@@ -0,0 +1,169 @@
+"""Pre-aggregated per-form counters kept up to date on every submission.
+
+Rebuild from db.responses when the counters drift:
+
+    python -m app.services.form_stats <form_id> [<form_id> ...]
+    python -m app.services.form_stats --all
+"""
+from typing import Dict, Any, List, Optional
+from bson import ObjectId
+import asyncio
+import logging
+import sys
+
+from app.services.analytics import build_analytics_pipeline
+from app.services.answers import response_answers
+from app.services.field_index import build_field_index
+from app.services.sketches import rebuild_form_sketches, sketch_buffer
+
+logger = logging.getLogger(__name__)
+
+# Mongo keys may not contain "." or start with "$", so option values are escaped
+_KEY_ESCAPES = [("%", "%25"), (".", "%2E"), ("$", "%24")]
+
+
+def _encode_key(value: str) -> str:
+    for char, escaped in _KEY_ESCAPES:
+        value = value.replace(char, escaped)
+    return value
+
+
+def _decode_key(key: str) -> str:
+    for char, escaped in reversed(_KEY_ESCAPES):
+        key = key.replace(escaped, char)
+    return key
+
+
+def _to_number(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def record_submission(db, form_id: str, field_index: Dict[str, Dict[str, Any]], document: dict):
+    """Bump the form counters and the per-field tallies for one stored response"""
+    await record_submissions(db, form_id, field_index, [document])
+
+
+async def record_submissions(db, form_id: str, field_index: Dict[str, Dict[str, Any]],
+                             documents: List[dict]):
+    """Fold a batch of stored responses for one form into a single counter update"""
+    if not documents:
+        return
+    sketch_buffer.record(form_id, field_index, documents)
+
+    last_response_at = max(document["submitted_at"] for document in documents)
+    inc = {"total_responses": len(documents)}
+    minimum, maximum = {}, {}
+    for document in documents:
+        for field_id, value in response_answers(document).items():
+            field_type = field_index.get(field_id, {}).get("field_type")
+            prefix = f"fields.{field_id}"
+
+            inc[f"{prefix}.answered"] = inc.get(f"{prefix}.answered", 0) + 1
+            if field_type == "single_choice" and value != "":
+                key = f"{prefix}.options.{_encode_key(str(value))}"
+                inc[key] = inc.get(key, 0) + 1
+            elif field_type == "number":
+                number = _to_number(value)
+                if number is not None:
+                    inc[f"{prefix}.count"] = inc.get(f"{prefix}.count", 0) + 1
+                    inc[f"{prefix}.sum"] = inc.get(f"{prefix}.sum", 0) + number
+                    minimum[f"{prefix}.min"] = min(number, minimum.get(f"{prefix}.min", number))
+                    maximum[f"{prefix}.max"] = max(number, maximum.get(f"{prefix}.max", number))
+
+    update = {"$inc": inc, "$max": {"last_response_at": last_response_at, **maximum}}
+    if minimum:
+        update["$min"] = minimum
+    # Independent documents, so both updates share one round trip
+    await asyncio.gather(
+        db.forms.update_one(
+            {"_id": ObjectId(form_id)},
+            {"$inc": {"total_responses": len(documents)}, "$max": {"last_response_at": last_response_at}}
+        ),
+        db.form_stats.update_one({"_id": form_id}, update, upsert=True),
+    )
+
+
+def _decode_stats(stats: dict) -> Dict[str, Any]:
+    fields = {}
+    for field_id, field_stats in (stats.get("fields") or {}).items():
+        field_stats = dict(field_stats)
+        if "options" in field_stats:
+            field_stats["options"] = {_decode_key(k): v for k, v in field_stats["options"].items()}
+        if field_stats.get("count"):
+            field_stats["mean"] = field_stats["sum"] / field_stats["count"]
+        fields[field_id] = field_stats
+
+    return {
+        "form_id": stats["_id"],
+        "total_responses": stats.get("total_responses", 0),
+        "last_response_at": stats.get("last_response_at"),
+        "fields": fields,
+    }
+
+
+async def get_form_stats(db, form_id: str) -> Dict[str, Any]:
+    """Read the pre-aggregated stats for a form with a single primary-key lookup"""
+    stats = await db.form_stats.find_one({"_id": form_id})
+    return _decode_stats(stats or {"_id": form_id})
+
+
+async def rebuild_form_stats(db, form_id: str) -> Dict[str, Any]:
+    """Recompute a form's stats document, sketches and counters from db.responses"""
+    form = await db.forms.find_one({"_id": ObjectId(form_id)})
+    if not form:
+        raise ValueError(f"Form {form_id} not found")
+
+    field_index = build_field_index(form)
+    pipeline = build_analytics_pipeline(form_id, field_index)
+    result = (await db.responses.aggregate(pipeline, allowDiskUse=True).to_list(length=1) or [{}])[0]
+
+    totals = result["totals"][0] if result.get("totals") else {}
+    fields = {row["_id"]: {"answered": row["count"]} for row in result.get("answered", [])}
+    for row in result.get("choices", []):
+        if row["_id"]["value"] == "":
+            continue
+        field_stats = fields.setdefault(row["_id"]["field_id"], {"answered": 0})
+        field_stats.setdefault("options", {})[_encode_key(str(row["_id"]["value"]))] = row["count"]
+    for row in result.get("numbers", []):
+        fields.setdefault(row["_id"], {"answered": 0}).update({
+            "count": row["count"], "sum": row["sum"], "min": row["min"], "max": row["max"],
+        })
+
+    stats = {
+        "_id": form_id,
+        "total_responses": totals.get("total", 0),
+        "last_response_at": totals.get("last_response_at"),
+        "fields": fields,
+    }
+    await db.form_stats.replace_one({"_id": form_id}, stats, upsert=True)
+    await rebuild_form_sketches(db, form_id, field_index)
+    await db.forms.update_one(
+        {"_id": ObjectId(form_id)},
+        {"$set": {"total_responses": stats["total_responses"], "last_response_at": stats["last_response_at"]}}
+    )
+    return _decode_stats(stats)
+
+
+async def _rebuild(form_ids: List[str]):
+    from app.database.connection import connect_to_mongo, close_mongo_connection, get_database
+
+    await connect_to_mongo()
+    try:
+        db = get_database()
+        if form_ids == ["--all"]:
+            form_ids = [str(form["_id"]) async for form in db.forms.find({}, {"_id": 1})]
+        for form_id in form_ids:
+            stats = await rebuild_form_stats(db, form_id)
+            logger.info(f"Rebuilt stats for form {form_id}: {stats['total_responses']} responses")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(__doc__)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_rebuild(sys.argv[1:]))
@@ -0,0 +1,164 @@
+"""Per-route request metrics exported in the Prometheus text format.
+
+MetricsMiddleware times every request by route template and, through the
+command listener in app.database.monitoring, how much of that time was spent
+waiting on Mongo. Each worker process keeps its own registry.
+"""
+from bisect import bisect_left
+from typing import Callable, Dict, List, Tuple
+import threading
+import time
+
+from app.database.monitoring import RequestDbTime, command_metrics, pool_metrics, request_db_time
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Labels, extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = labels + extra
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(str(value))}"' for key, value in pairs) + "}"
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Labels, int] = {}
+        self.in_flight: Dict[Labels, int] = {}
+        self.latency: Dict[Labels, Histogram] = {}
+        self.db_latency: Dict[Labels, Histogram] = {}
+        self.db_commands: Dict[Labels, int] = {}
+        self._collectors: List[Callable[[], List[str]]] = []
+
+    def add_collector(self, collector: Callable[[], List[str]]):
+        """Register a callable returning extra exposition lines at scrape time"""
+        self._collectors.append(collector)
+
+    def started(self, in_flight_labels: Labels):
+        with self._lock:
+            self.in_flight[in_flight_labels] = self.in_flight.get(in_flight_labels, 0) + 1
+
+    def finished(self, in_flight_labels: Labels, labels: Labels, status: int, seconds: float,
+                 db_time: RequestDbTime):
+        with self._lock:
+            self.in_flight[in_flight_labels] = self.in_flight.get(in_flight_labels, 1) - 1
+            counter_labels = labels + (("status", str(status)),)
+            self.requests[counter_labels] = self.requests.get(counter_labels, 0) + 1
+            self.latency.setdefault(labels, Histogram()).observe(seconds)
+            self.db_latency.setdefault(labels, Histogram()).observe(db_time.seconds)
+            self.db_commands[labels] = self.db_commands.get(labels, 0) + db_time.commands
+
+    def _histogram_lines(self, name: str, histograms: Dict[Labels, Histogram]) -> List[str]:
+        lines = []
+        for labels, histogram in histograms.items():
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels, (('le', str(bound)),))} {cumulative}")
+            cumulative += histogram.counts[-1]
+            lines.append(f"{name}_bucket{_format_labels(labels, (('le', '+Inf'),))} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+    def render(self) -> str:
+        with self._lock:
+            lines = [
+                "# HELP http_requests_total Requests served, by route template and status.",
+                "# TYPE http_requests_total counter",
+                *(f"http_requests_total{_format_labels(labels)} {count}" for labels, count in self.requests.items()),
+                "# HELP http_requests_in_flight Requests currently being served, by method.",
+                "# TYPE http_requests_in_flight gauge",
+                *(f"http_requests_in_flight{_format_labels(labels)} {count}" for labels, count in self.in_flight.items()),
+                "# HELP http_request_duration_seconds Wall-clock request latency.",
+                "# TYPE http_request_duration_seconds histogram",
+                *self._histogram_lines("http_request_duration_seconds", self.latency),
+                "# HELP http_request_db_duration_seconds Time spent in Mongo commands per request.",
+                "# TYPE http_request_db_duration_seconds histogram",
+                *self._histogram_lines("http_request_db_duration_seconds", self.db_latency),
+                "# HELP http_request_db_commands_total Mongo commands issued while serving requests.",
+                "# TYPE http_request_db_commands_total counter",
+                *(f"http_request_db_commands_total{_format_labels(labels)} {count}" for labels, count in self.db_commands.items()),
+            ]
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def _mongo_lines() -> List[str]:
+    pool = pool_metrics.snapshot()
+    lines = [
+        "# HELP mongodb_pool_connections Connections in the driver pool, by state.",
+        "# TYPE mongodb_pool_connections gauge",
+        f'mongodb_pool_connections{{state="open"}} {pool["open_connections"]}',
+        f'mongodb_pool_connections{{state="checked_out"}} {pool["checked_out"]}',
+        "# HELP mongodb_pool_wait_queue_depth Operations waiting for a pooled connection.",
+        "# TYPE mongodb_pool_wait_queue_depth gauge",
+        f"mongodb_pool_wait_queue_depth {pool['wait_queue_depth']}",
+        "# HELP mongodb_commands_total Mongo commands by name and outcome.",
+        "# TYPE mongodb_commands_total counter",
+    ]
+    for name, stats in command_metrics.snapshot().items():
+        lines.append(f'mongodb_commands_total{{command="{name}",outcome="success"}} {stats["count"] - stats["failures"]}')
+        lines.append(f'mongodb_commands_total{{command="{name}",outcome="failure"}} {stats["failures"]}')
+    return lines
+
+
+registry = MetricsRegistry()
+registry.add_collector(_mongo_lines)
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware so streaming responses are timed to their last byte"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        db_time = RequestDbTime()
+        token = request_db_time.set(db_time)
+        # The route template is only known once the router has matched
+        in_flight_labels = (("method", scope["method"]),)
+        registry.started(in_flight_labels)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            request_db_time.reset(token)
+            # Unmatched paths share one label so random URLs can't blow up cardinality;
+            # requests shed before routing are labelled with their admission class
+            route = getattr(scope.get("route"), "path", None)
+            if route is None:
+                route = f"class:{scope['admission_class']}" if "admission_class" in scope else "unmatched"
+            labels = (("method", scope["method"]), ("route", route))
+            registry.finished(in_flight_labels, labels, status["code"], elapsed, db_time)
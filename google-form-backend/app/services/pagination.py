@@ -0,0 +1,68 @@
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import base64
+import os
+
+from bson import ObjectId, json_util
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 100))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 1000))
+
+SortSpec = List[Tuple[str, int]]
+
+# Only plain sort-key values may reach a filter; a decoded dict could smuggle in query operators
+CURSOR_VALUE_TYPES = (ObjectId, datetime, str, int, float)
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """Opaque cursor holding the sort-key values of the last document on a page"""
+    raw = json_util.dumps(values).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Inverse of encode_cursor; raises ValueError for anything it didn't produce"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json_util.loads(raw)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_filter(sort: SortSpec, last: Dict[str, Any]) -> dict:
+    """Match documents strictly after `last` in the given sort order"""
+    clauses = []
+    for position, (key, direction) in enumerate(sort):
+        if not _is_cursor_value(last.get(key)):
+            raise ValueError("Invalid cursor")
+        clause = {previous: last[previous] for previous, _ in sort[:position]}
+        clause[key] = {"$gt" if direction > 0 else "$lt": last[key]}
+        clauses.append(clause)
+    return clauses[0] if len(clauses) == 1 else {"$or": clauses}
+
+
+def _is_cursor_value(value: Any) -> bool:
+    return isinstance(value, CURSOR_VALUE_TYPES) and not isinstance(value, bool)
+
+
+async def fetch_page(collection, query: dict, sort: SortSpec, cursor: Optional[str], limit: int,
+                     projection: Optional[dict] = None) -> Tuple[List[dict], Optional[str]]:
+    """One page of documents plus the cursor for the next page (None on the last one).
+
+    Seeks past the previous page with a range on the sort keys, so with an
+    index on those keys every page costs O(limit) regardless of depth.
+    """
+    if cursor is not None:
+        query = {"$and": [query, keyset_filter(sort, decode_cursor(cursor))]}
+
+    # One extra document tells us whether another page exists
+    documents = await collection.find(query, projection).sort(sort).limit(limit + 1).to_list(length=limit + 1)
+
+    next_cursor = None
+    if len(documents) > limit:
+        documents = documents[:limit]
+        next_cursor = encode_cursor({key: documents[-1].get(key) for key, _ in sort})
+    return documents, next_cursor
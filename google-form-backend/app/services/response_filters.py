@@ -0,0 +1,79 @@
+"""Translate a response search into a Mongo query served from indexes.
+
+Answer filters become predicates on answers.<field_id>. Field IDs are unique
+to their form, so the one wildcard index on answers.$** serves equality,
+$in and range lookups on any question of any form without per-form indexes.
+submitted_at ranges use the (form_id, submitted_at, _id) index. Text search
+uses the (form_id, $** text) index, which matches whole words with stemming;
+text_field_id narrows the matches to one question.
+
+Only responses in the answers layout (see app.services.answers) can be
+matched on answer values; run the response migration first.
+"""
+from typing import Any, Dict, List
+import re
+
+from app.services.answers import typed_value
+
+EQUALITY_OPS = {"eq", "in"}
+RANGE_OPS = {"gt": "$gt", "gte": "$gte", "lt": "$lt", "lte": "$lte"}
+TEXT_FIELD_TYPES = {"text", "textarea", "email"}
+MAX_IN_VALUES = 100
+
+
+def _answer_clause(answer_filter, field_index: Dict[str, Dict[str, Any]]) -> dict:
+    details = field_index.get(answer_filter.field_id)
+    if details is None:
+        raise ValueError(f"Field {answer_filter.field_id} is not part of this form")
+    field_type = details.get("field_type")
+    path = f"answers.{answer_filter.field_id}"
+    op = answer_filter.op
+
+    if op == "eq":
+        if answer_filter.value is None:
+            raise ValueError("eq needs a value")
+        return {path: typed_value(str(answer_filter.value), field_type)}
+    if op == "in":
+        if not answer_filter.values:
+            raise ValueError("in needs values")
+        if len(answer_filter.values) > MAX_IN_VALUES:
+            raise ValueError(f"in accepts at most {MAX_IN_VALUES} values")
+        return {path: {"$in": [typed_value(str(value), field_type) for value in answer_filter.values]}}
+    if op in RANGE_OPS:
+        if field_type != "number":
+            raise ValueError(f"{op} only applies to number fields")
+        value = typed_value(str(answer_filter.value), field_type)
+        if not isinstance(value, (int, float)):
+            raise ValueError(f"{op} needs a number")
+        return {path: {RANGE_OPS[op]: value}}
+    raise ValueError(f"Unknown filter op {op}")
+
+
+def build_response_query(form_id: str, search, field_index: Dict[str, Dict[str, Any]]) -> dict:
+    """Query for ResponseSearch criteria; raises ValueError on filters that don't fit the form"""
+    clauses: List[dict] = [{"form_id": form_id}]
+    clauses.extend(_answer_clause(answer_filter, field_index) for answer_filter in search.filters)
+
+    submitted = {}
+    if search.submitted_after is not None:
+        submitted["$gte"] = search.submitted_after
+    if search.submitted_before is not None:
+        submitted["$lt"] = search.submitted_before
+    if submitted:
+        clauses.append({"submitted_at": submitted})
+
+    if search.text:
+        clauses.append({"$text": {"$search": search.text}})
+        if search.text_field_id is not None:
+            details = field_index.get(search.text_field_id)
+            if details is None:
+                raise ValueError(f"Field {search.text_field_id} is not part of this form")
+            if details.get("field_type") not in TEXT_FIELD_TYPES:
+                raise ValueError("Text search only applies to text, textarea and email fields")
+            # Runs only over the documents the text index already matched
+            pattern = re.escape(search.text)
+            clauses.append({f"answers.{search.text_field_id}": {"$regex": pattern, "$options": "i"}})
+    elif search.text_field_id is not None:
+        raise ValueError("text_field_id needs text")
+
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
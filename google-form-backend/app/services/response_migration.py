@@ -0,0 +1,111 @@
+"""Rewrite stored responses from the field_responses list to the answers sub-document.
+
+Runs in _id order, one batch at a time. After each batch the last migrated
+_id is checkpointed in db.migrations, so an interrupted run picks up where it
+stopped. Each update is conditional on the document still having its
+field_responses list, so running it twice, or next to the app, is safe.
+Reads accept both layouts while the migration is in progress. If
+RESPONSE_LAYOUT=list was used during the rollout, run once more with
+--restart after switching it off to pick up anything written in between.
+
+    python -m app.services.response_migration [--batch-size 1000] [--pause-ms 0] [--restart]
+"""
+from datetime import datetime
+from typing import Any, Dict
+import argparse
+import asyncio
+import logging
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from app.services.answers import encode_answers
+from app.services.field_index import build_field_index
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_ID = "response_answers"
+
+
+async def migrate_batch(db, after_id, batch_size: int, field_indexes: Dict[str, Dict[str, Any]]):
+    """Migrate the next batch of list-layout responses; returns (last _id seen, migrated count)"""
+    query = {"field_responses": {"$exists": True}}
+    if after_id is not None:
+        query["_id"] = {"$gt": after_id}
+    documents = await db.responses.find(query, {"form_id": 1, "field_responses": 1}) \
+        .sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+    if not documents:
+        return None, 0
+
+    # Field types decide which answers become numbers; load each form once
+    missing = {document["form_id"] for document in documents} - set(field_indexes)
+    valid = [ObjectId(form_id) for form_id in missing if ObjectId.is_valid(form_id)]
+    async for form in db.forms.find({"_id": {"$in": valid}}, {"fields": 1}):
+        field_indexes[str(form["_id"])] = build_field_index(form)
+    for form_id in missing:
+        field_indexes.setdefault(form_id, {})  # deleted form: keep answers as stored
+
+    updates = [
+        UpdateOne(
+            {"_id": document["_id"], "field_responses": {"$exists": True}},
+            {
+                "$set": {"answers": encode_answers(document["field_responses"], field_indexes[document["form_id"]])},
+                "$unset": {"field_responses": ""},
+            },
+        )
+        for document in documents
+    ]
+    result = await db.responses.bulk_write(updates, ordered=False)
+    return documents[-1]["_id"], result.modified_count
+
+
+async def migrate_responses(db, batch_size: int = 1000, pause: float = 0, restart: bool = False) -> int:
+    """Migrate every list-layout response, resuming from the stored checkpoint"""
+    checkpoint = None if restart else await db.migrations.find_one({"_id": MIGRATION_ID})
+    after_id = checkpoint.get("last_id") if checkpoint else None
+    migrated = checkpoint.get("migrated", 0) if checkpoint else 0
+    if after_id is not None:
+        logger.info(f"Resuming after {after_id} ({migrated} responses already migrated)")
+
+    field_indexes: Dict[str, Dict[str, Any]] = {}
+    while True:
+        last_id, count = await migrate_batch(db, after_id, batch_size, field_indexes)
+        if last_id is None:
+            break
+        after_id = last_id
+        migrated += count
+        await db.migrations.update_one(
+            {"_id": MIGRATION_ID},
+            {"$set": {"last_id": after_id, "migrated": migrated, "updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        logger.info(f"Migrated {migrated} responses (through {after_id})")
+        if pause:
+            await asyncio.sleep(pause)
+
+    await db.migrations.update_one(
+        {"_id": MIGRATION_ID},
+        {"$set": {"completed_at": datetime.utcnow(), "migrated": migrated}},
+        upsert=True
+    )
+    return migrated
+
+
+async def _main(args):
+    from app.database.connection import connect_to_mongo, close_mongo_connection, get_database
+
+    await connect_to_mongo()
+    try:
+        migrated = await migrate_responses(get_database(), args.batch_size, args.pause_ms / 1000, args.restart)
+        logger.info(f"Done: {migrated} responses use the answers layout")
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move stored responses to the answers sub-document layout.")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--pause-ms", type=int, default=0, help="Sleep between batches to limit load")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and scan from the start")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
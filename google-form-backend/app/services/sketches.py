@@ -0,0 +1,330 @@
+"""Streaming sketches for free-text answers (text, textarea and email fields).
+
+Exact distinct counts and most-common answers would need a scan and a hash
+map that grows with every response. Each of these fields instead keeps:
+
+- a HyperLogLog of 2**SKETCH_HLL_PRECISION one-byte registers for the distinct
+  count. The relative standard error is 1.04 / sqrt(2**precision), which is
+  2.3% at the default precision of 11 (2 KB per field).
+- a Space-Saving summary of SKETCH_TOP_K counters for the most common answers.
+  A reported count overestimates the true one by at most its max_overcount,
+  and that never exceeds total / SKETCH_TOP_K. Any answer given more often
+  than that is guaranteed to be listed.
+
+Answers are compared after trimming, collapsing whitespace and casefolding.
+They are truncated to SKETCH_MAX_VALUE_LENGTH characters.
+
+Every worker folds submissions into an in-memory delta (record_submissions
+calls SketchBuffer.record). A background task merges the deltas into one
+db.form_sketches document per form every SKETCH_FLUSH_INTERVAL_SECONDS.
+Both sketches are mergeable: registers take the max and Space-Saving
+summaries combine as in Agarwal et al., "Mergeable Summaries". Reads are a
+single document lookup, but stay up to one flush interval behind the
+submissions.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import hashlib
+import logging
+import math
+import os
+
+from bson import Binary
+from pymongo.errors import DuplicateKeyError, PyMongoError
+
+from app.services.answers import ANSWERS_PROJECTION, response_answers
+
+logger = logging.getLogger(__name__)
+
+SKETCHES = os.getenv("SKETCHES", "true").lower() in ("1", "true", "yes")
+SKETCH_HLL_PRECISION = int(os.getenv("SKETCH_HLL_PRECISION", 11))
+SKETCH_TOP_K = int(os.getenv("SKETCH_TOP_K", 32))
+SKETCH_MAX_VALUE_LENGTH = int(os.getenv("SKETCH_MAX_VALUE_LENGTH", 200))
+SKETCH_FLUSH_INTERVAL_SECONDS = float(os.getenv("SKETCH_FLUSH_INTERVAL_SECONDS", 5))
+
+SKETCHED_FIELD_TYPES = {"text", "textarea", "email"}
+
+# Attempts at the optimistic read-merge-write before a delta is kept for the next flush
+MERGE_ATTEMPTS = 5
+
+
+def normalize_answer(value: Any) -> str:
+    return " ".join(str(value).split()).casefold()[:SKETCH_MAX_VALUE_LENGTH]
+
+
+class HyperLogLog:
+    def __init__(self, precision: int = SKETCH_HLL_PRECISION, registers: Optional[bytes] = None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers is not None else bytearray(self.size)
+
+    def add(self, value: str):
+        hashed = int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+        index = hashed >> (64 - self.precision)
+        remainder = hashed & ((1 << (64 - self.precision)) - 1)
+        rank = (64 - self.precision) - remainder.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: "HyperLogLog"):
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLogs of different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are still empty
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    @property
+    def relative_error(self) -> float:
+        return 1.04 / math.sqrt(self.size)
+
+
+class SpaceSaving:
+    def __init__(self, capacity: int = SKETCH_TOP_K, counters: Optional[Dict[str, List[int]]] = None):
+        self.capacity = capacity
+        # value -> [count, max overcount]
+        self.counters: Dict[str, List[int]] = counters or {}
+
+    def add(self, value: str, weight: int = 1):
+        counter = self.counters.get(value)
+        if counter is not None:
+            counter[0] += weight
+        elif len(self.counters) < self.capacity:
+            self.counters[value] = [weight, 0]
+        else:
+            # Evict the smallest counter; the newcomer inherits its count as possible overcount
+            smallest = min(self.counters, key=lambda key: self.counters[key][0])
+            floor = self.counters.pop(smallest)[0]
+            self.counters[value] = [floor + weight, floor]
+
+    def _floor(self) -> int:
+        if len(self.counters) < self.capacity:
+            return 0
+        return min(count for count, _ in self.counters.values())
+
+    def merge(self, other: "SpaceSaving"):
+        own_floor, other_floor = self._floor(), other._floor()
+        merged = {}
+        for value in set(self.counters) | set(other.counters):
+            count, error = self.counters.get(value, [own_floor, own_floor])
+            other_count, other_error = other.counters.get(value, [other_floor, other_floor])
+            merged[value] = [count + other_count, error + other_error]
+        top = sorted(merged.items(), key=lambda item: item[1][0], reverse=True)[:self.capacity]
+        self.counters = dict(top)
+
+    def top(self) -> List[Tuple[str, int, int]]:
+        ranked = sorted(self.counters.items(), key=lambda item: item[1][0], reverse=True)
+        return [(value, count, error) for value, (count, error) in ranked]
+
+
+class FieldSketch:
+    def __init__(self, total: int = 0, hll: Optional[HyperLogLog] = None, top: Optional[SpaceSaving] = None):
+        self.total = total
+        self.hll = hll or HyperLogLog()
+        self.top = top or SpaceSaving()
+
+    def add(self, value: str):
+        self.total += 1
+        self.hll.add(value)
+        self.top.add(value)
+
+    def merge(self, other: "FieldSketch"):
+        self.total += other.total
+        self.hll.merge(other.hll)
+        self.top.merge(other.top)
+
+    def to_document(self) -> dict:
+        return {
+            "total": self.total,
+            "precision": self.hll.precision,
+            "hll": Binary(bytes(self.hll.registers)),
+            "capacity": self.top.capacity,
+            "top": [[value, count, error] for value, count, error in self.top.top()],
+        }
+
+    @classmethod
+    def from_document(cls, document: dict) -> "FieldSketch":
+        return cls(
+            total=document.get("total", 0),
+            hll=HyperLogLog(document.get("precision", SKETCH_HLL_PRECISION), document.get("hll")),
+            top=SpaceSaving(
+                document.get("capacity", SKETCH_TOP_K),
+                {value: [count, error] for value, count, error in document.get("top", [])}
+            ),
+        )
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "answered": self.total,
+            "distinct": self.hll.count(),
+            "distinct_relative_error": round(self.hll.relative_error, 4),
+            "top_values": [
+                {"value": value, "count": count, "max_overcount": error}
+                for value, count, error in self.top.top()
+            ],
+            "top_values_max_overcount": self.total // self.top.capacity,
+        }
+
+
+def sketch_field_ids(field_index: Dict[str, Dict[str, Any]]) -> List[str]:
+    return [field_id for field_id, details in field_index.items() if details.get("field_type") in SKETCHED_FIELD_TYPES]
+
+
+def add_answers(sketches: Dict[str, FieldSketch], field_ids: List[str], document: dict):
+    answers = response_answers(document)
+    for field_id in field_ids:
+        value = answers.get(field_id)
+        if value is None:
+            continue
+        value = normalize_answer(value)
+        if value:
+            sketches.setdefault(field_id, FieldSketch()).add(value)
+
+
+async def merge_form_sketches(db, form_id: str, delta: Dict[str, FieldSketch]) -> bool:
+    """Fold a delta into the stored sketches with an optimistic version check"""
+    for _ in range(MERGE_ATTEMPTS):
+        stored = await db.form_sketches.find_one({"_id": form_id})
+        fields = {}
+        for field_id, sketch in delta.items():
+            document = (stored or {}).get("fields", {}).get(field_id)
+            merged = FieldSketch.from_document(document) if document else FieldSketch()
+            merged.merge(sketch)
+            fields[f"fields.{field_id}"] = merged.to_document()
+
+        if stored is None:
+            try:
+                await db.form_sketches.insert_one({
+                    "_id": form_id,
+                    "version": 1,
+                    "updated_at": datetime.utcnow(),
+                    "fields": {key.split(".", 1)[1]: value for key, value in fields.items()},
+                })
+                return True
+            except DuplicateKeyError:
+                continue
+
+        result = await db.form_sketches.update_one(
+            {"_id": form_id, "version": stored.get("version", 0)},
+            {"$set": {**fields, "updated_at": datetime.utcnow()}, "$inc": {"version": 1}}
+        )
+        if result.matched_count:
+            return True
+    return False
+
+
+class SketchBuffer:
+    """Per-worker sketch deltas, merged into db.form_sketches in the background"""
+
+    def __init__(self, flush_interval: float = SKETCH_FLUSH_INTERVAL_SECONDS):
+        self.flush_interval = flush_interval
+        self._db = None
+        self._pending: Dict[str, Dict[str, FieldSketch]] = {}
+        self._flusher = None
+        self.flushes = 0
+        self.conflicts = 0
+
+    def record(self, form_id: str, field_index: Dict[str, Dict[str, Any]], documents: List[dict]):
+        field_ids = sketch_field_ids(field_index)
+        if not SKETCHES or not field_ids:
+            return
+        sketches = self._pending.setdefault(form_id, {})
+        for document in documents:
+            add_answers(sketches, field_ids, document)
+
+    async def start(self, db):
+        self._db = db
+        self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        if self._db is not None:
+            await self.flush()
+
+    async def flush(self):
+        if self._db is None:
+            return
+        pending, self._pending = self._pending, {}
+        for form_id, delta in pending.items():
+            if not delta:
+                continue
+            try:
+                merged = await merge_form_sketches(self._db, form_id, delta)
+            except PyMongoError as e:
+                logger.error(f"Sketch flush for form {form_id} failed: {e}")
+                merged = False
+            if merged:
+                self.flushes += 1
+            else:
+                # Keep the delta and retry on the next flush
+                self.conflicts += 1
+                kept = self._pending.setdefault(form_id, {})
+                for field_id, sketch in delta.items():
+                    if field_id in kept:
+                        sketch.merge(kept[field_id])
+                    kept[field_id] = sketch
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Sketch flusher error: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": SKETCHES,
+            "pending_forms": len(self._pending),
+            "flushes": self.flushes,
+            "conflicts": self.conflicts,
+        }
+
+
+async def get_form_sketches(db, form_id: str) -> Tuple[int, Dict[str, Dict[str, Any]]]:
+    """(version, field_id -> sketch summary) from the stored sketches of a form"""
+    stored = await db.form_sketches.find_one({"_id": form_id})
+    if not stored:
+        return 0, {}
+    return stored.get("version", 0), {
+        field_id: FieldSketch.from_document(document).summary()
+        for field_id, document in stored.get("fields", {}).items()
+    }
+
+
+async def rebuild_form_sketches(db, form_id: str, field_index: Dict[str, Dict[str, Any]]):
+    """Recompute a form's sketches from db.responses, replacing what is stored"""
+    field_ids = sketch_field_ids(field_index)
+    sketches: Dict[str, FieldSketch] = {}
+    if field_ids:
+        async for document in db.responses.find({"form_id": form_id}, ANSWERS_PROJECTION):
+            add_answers(sketches, field_ids, document)
+
+    stored = await db.form_sketches.find_one({"_id": form_id}, {"version": 1})
+    await db.form_sketches.replace_one(
+        {"_id": form_id},
+        {
+            "_id": form_id,
+            "version": (stored or {}).get("version", 0) + 1,
+            "updated_at": datetime.utcnow(),
+            "fields": {field_id: sketch.to_document() for field_id, sketch in sketches.items()},
+        },
+        upsert=True
+    )
+
+
+sketch_buffer = SketchBuffer()
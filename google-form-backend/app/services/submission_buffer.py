@@ -0,0 +1,318 @@
+"""Write-behind buffer for form submissions.
+
+With SUBMISSION_BUFFER=true, submit_response appends the validated document
+to a local append-only log and acknowledges right away. A background task
+writes the buffered documents to db.responses with insert_many once
+SUBMISSION_FLUSH_SIZE documents are pending, or every
+SUBMISSION_FLUSH_INTERVAL_MS milliseconds.
+
+Every worker process logs to its own SUBMISSION_LOG_PATH.<pid> and holds a
+lock on SUBMISSION_LOG_PATH.<pid>.lock while it runs. Each flush first rotates
+the log. The rotated segment is deleted only once its documents are in Mongo.
+On startup a worker takes over the logs and segments of every process whose
+lock is no longer held, and replays them. Every document gets its _id before
+it is logged, so a replay of documents that were already written fails with
+a duplicate key instead of creating a second copy. Counters are updated chunk
+by chunk as documents are inserted, so a retried flush never counts a
+document twice.
+"""
+from typing import Dict, List, Set
+import asyncio
+import fcntl
+import glob
+import logging
+import os
+import time
+
+from bson import ObjectId, json_util
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.services.field_index import build_field_index
+from app.services.form_stats import record_submissions
+
+logger = logging.getLogger(__name__)
+
+SUBMISSION_BUFFER = os.getenv("SUBMISSION_BUFFER", "false").lower() in ("1", "true", "yes")
+SUBMISSION_LOG_PATH = os.getenv("SUBMISSION_LOG_PATH", "data/submissions.log")
+SUBMISSION_FLUSH_SIZE = int(os.getenv("SUBMISSION_FLUSH_SIZE", 500))
+SUBMISSION_FLUSH_INTERVAL_MS = int(os.getenv("SUBMISSION_FLUSH_INTERVAL_MS", 200))
+SUBMISSION_MAX_PENDING = int(os.getenv("SUBMISSION_MAX_PENDING", 100000))
+# fsync every append before acknowledging; off trades power-loss durability for latency
+SUBMISSION_LOG_FSYNC = os.getenv("SUBMISSION_LOG_FSYNC", "true").lower() in ("1", "true", "yes")
+
+DUPLICATE_KEY = 11000
+
+
+class BufferFullError(Exception):
+    """Raised when Mongo has fallen too far behind to accept more buffered submissions"""
+
+
+class SubmissionBuffer:
+    def __init__(self, path: str = SUBMISSION_LOG_PATH, flush_size: int = SUBMISSION_FLUSH_SIZE,
+                 flush_interval_ms: int = SUBMISSION_FLUSH_INTERVAL_MS,
+                 max_pending: int = SUBMISSION_MAX_PENDING, fsync: bool = SUBMISSION_LOG_FSYNC):
+        self.base_path = path
+        # This process's log, set on start
+        self.path = None
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self.fsync = fsync
+        self._db = None
+        self._fd = None
+        self._lock_fd = None
+        # fd -> fsyncs still running on it; a rotated log is closed when its last fsync returns
+        self._syncing: Dict[int, int] = {}
+        self._retired: Set[int] = set()
+        self._pending: List[dict] = []
+        # Log files whose documents are all in _pending and not yet in Mongo
+        self._backing_files: List[str] = []
+        self._wake = asyncio.Event()
+        self._flusher = None
+        self._flush_lock = asyncio.Lock()
+        self.flushed = 0
+        self.duplicates = 0
+        self.rejected = 0
+
+    async def start(self, db):
+        """Replay whatever earlier processes left behind, then start flushing"""
+        self._db = db
+        os.makedirs(os.path.dirname(self.base_path) or ".", exist_ok=True)
+        self.path = f"{self.base_path}.{os.getpid()}"
+        self._lock_fd = _hold_lock(f"{self.path}.lock")
+
+        # An earlier process with our pid, then every process that no longer holds its lock
+        leftovers = self._adopt(self.path)
+        for lock_path in glob.glob(f"{self.base_path}.*.lock"):
+            owner = lock_path[len(self.base_path) + 1:-len(".lock")]
+            if owner.isdigit() and lock_path != f"{self.path}.lock":
+                leftovers.extend(self._adopt_dead(f"{self.base_path}.{owner}"))
+
+        for segment in leftovers:
+            self._pending.extend(self._read_segment(segment))
+            self._backing_files.append(segment)
+        if self._pending:
+            logger.info(f"Replaying {len(self._pending)} buffered submissions from {len(leftovers)} log segments")
+
+        self._open_log()
+        await self.flush()
+        self._flusher = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Drain everything that is buffered before shutdown"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+        if self._fd is not None:
+            self._close_log()
+            if not self._pending:
+                # Everything logged so far was flushed, so the open log is empty
+                os.remove(self.path)
+        if self._lock_fd is not None:
+            if self._pending:
+                # The lock file stays so the next worker to start takes over what is left
+                logger.warning(f"{len(self._pending)} submissions still buffered at shutdown; they will be replayed on start")
+            else:
+                os.remove(f"{self.path}.lock")
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    async def submit(self, document: dict) -> ObjectId:
+        """Durably log a validated response document and queue it for the next flush"""
+        if len(self._pending) >= self.max_pending:
+            raise BufferFullError("Submission buffer is full")
+
+        document.setdefault("_id", ObjectId())
+        line = (json_util.dumps(document) + "\n").encode("utf-8")
+        # Logged and queued without awaiting in between, so the flush that rotates this log also takes the document.
+        # O_APPEND makes each single write land whole at the end of the log.
+        fd = self._fd
+        os.write(fd, line)
+        self._pending.append(document)
+        if len(self._pending) >= self.flush_size:
+            self._wake.set()
+
+        if self.fsync:
+            await self._sync(fd)
+        return document["_id"]
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._pending:
+                return
+
+            # Swap out the batch and its log without awaiting, so later submits go to the new log
+            batch, self._pending = self._pending, []
+            files, self._backing_files = self._backing_files, []
+            if self._fd is not None:
+                self._close_log()
+                files.append(self._rotate_path())
+                os.rename(self.path, files[-1])
+                self._open_log()
+
+            try:
+                await self._write(batch)
+            except PyMongoError as e:
+                logger.error(f"Flushing {len(batch)} buffered submissions failed, will retry: {e}")
+                self._pending = batch + self._pending
+                self._backing_files = files + self._backing_files
+                return
+
+            for segment in files:
+                os.remove(segment)
+
+    async def _write(self, batch: List[dict]):
+        field_indexes: Dict[str, dict] = {}
+        for start in range(0, len(batch), self.flush_size):
+            chunk = batch[start:start + self.flush_size]
+            failed = {}
+            try:
+                await self._db.responses.insert_many(chunk, ordered=False)
+            except BulkWriteError as e:
+                failed = {error["index"]: error for error in e.details.get("writeErrors", [])}
+
+            inserted: Dict[str, List[dict]] = {}
+            for position, document in enumerate(chunk):
+                error = failed.get(position)
+                if error is None:
+                    inserted.setdefault(document["form_id"], []).append(document)
+                elif error.get("code") == DUPLICATE_KEY:
+                    # Already written and counted, before a crash or by an earlier attempt at this batch
+                    self.duplicates += 1
+                else:
+                    self.rejected += 1
+                    self._reject(document, error.get("errmsg", "Write failed"))
+
+            # Counted now: if a later chunk fails the batch is retried, and this chunk comes back as duplicates
+            self.flushed += sum(len(documents) for documents in inserted.values())
+            await self._record(inserted, field_indexes)
+
+    async def _record(self, inserted: Dict[str, List[dict]], field_indexes: Dict[str, dict]):
+        if not inserted:
+            return
+        try:
+            missing = [ObjectId(form_id) for form_id in inserted if form_id not in field_indexes]
+            if missing:
+                async for form in self._db.forms.find({"_id": {"$in": missing}}):
+                    field_indexes[str(form["_id"])] = build_field_index(form)
+            for form_id, documents in inserted.items():
+                if form_id in field_indexes:
+                    await record_submissions(self._db, form_id, field_indexes[form_id], documents)
+        except PyMongoError as e:
+            # The responses are stored; retrying the batch would not count them again
+            logger.error(
+                f"Counters missed {sum(len(documents) for documents in inserted.values())} buffered submissions, "
+                f"rebuild them with python -m app.services.form_stats --all: {e}"
+            )
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Submission flusher error: {e}")
+
+    async def _sync(self, fd: int):
+        self._syncing[fd] = self._syncing.get(fd, 0) + 1
+        try:
+            await asyncio.to_thread(os.fsync, fd)
+        finally:
+            self._syncing[fd] -= 1
+            if not self._syncing[fd]:
+                del self._syncing[fd]
+                if fd in self._retired:
+                    self._retired.discard(fd)
+                    os.close(fd)
+
+    def _open_log(self):
+        self._fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+
+    def _close_log(self):
+        fd, self._fd = self._fd, None
+        if fd in self._syncing:
+            # Closing now could hand the fd number to the next log while an fsync is still running on it
+            self._retired.add(fd)
+        else:
+            os.close(fd)
+
+    def _rotate_path(self) -> str:
+        return f"{self.path}.{time.time_ns()}.flushing"
+
+    def _adopt(self, log_path: str) -> List[str]:
+        """Rename a log and its rotated segments into segments of this process"""
+        segments = sorted(glob.glob(f"{log_path}.*.flushing"))
+        if os.path.exists(log_path):
+            segments.append(log_path)
+        adopted = []
+        for segment in segments:
+            adopted.append(self._rotate_path())
+            os.rename(segment, adopted[-1])
+        return adopted
+
+    def _adopt_dead(self, log_path: str) -> List[str]:
+        """Take over the files of another process, if it no longer holds its lock"""
+        try:
+            fd = os.open(f"{log_path}.lock", os.O_RDWR)
+        except FileNotFoundError:
+            return []
+        try:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return []  # still running
+            adopted = self._adopt(log_path)
+            os.remove(f"{log_path}.lock")
+            return adopted
+        finally:
+            os.close(fd)
+
+    def _read_segment(self, segment: str) -> List[dict]:
+        documents = []
+        with open(segment, "rb") as f:
+            for line in f:
+                try:
+                    documents.append(json_util.loads(line))
+                except ValueError:
+                    # A torn last line from a crash mid-append was never acknowledged
+                    logger.warning(f"Skipping unreadable line in {segment}")
+        return documents
+
+    def _reject(self, document: dict, reason: str):
+        logger.error(f"Buffered submission {document['_id']} rejected by Mongo: {reason}")
+        with open(f"{self.path}.rejected", "a") as f:
+            f.write(json_util.dumps({"reason": reason, "document": document}) + "\n")
+
+    def stats(self) -> dict:
+        return {
+            "enabled": SUBMISSION_BUFFER,
+            "pending": len(self._pending),
+            "flushed": self.flushed,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+        }
+
+
+def _hold_lock(lock_path: str) -> int:
+    """Open and lock a lock file, retrying if it was removed while we waited for it"""
+    while True:
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            if os.stat(lock_path).st_ino == os.fstat(fd).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+submission_buffer = SubmissionBuffer()
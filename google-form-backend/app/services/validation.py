@@ -0,0 +1,171 @@
+"""Per-form submission validators.
+
+A form's embedded fields are compiled once into a FormValidator: option sets,
+regexes and numeric bounds are prepared up front so checking a submission is
+a single pass over its answers. Validators are cached per form and rebuilt
+when the form's version changes.
+
+Supported validation_rules keys:
+    min_length, max_length  length bounds for text answers
+    pattern                 regex the whole answer must match
+    min, max                numeric bounds for number fields
+    integer                 number fields only accept whole numbers
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+import logging
+import math
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+FORM_VALIDATOR_CACHE_SIZE = int(os.getenv("FORM_VALIDATOR_CACHE_SIZE", 1024))
+
+EMAIL_PATTERN = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+
+
+class FieldError(NamedTuple):
+    field_id: str
+    code: str
+    message: str
+
+
+class CompiledField:
+    """One field's checks with everything that can be precomputed already done"""
+
+    __slots__ = ("field_id", "name", "field_type", "required", "options",
+                 "pattern", "min_length", "max_length", "minimum", "maximum", "integer")
+
+    def __init__(self, field_id: str, details: Dict[str, Any]):
+        rules = details.get("validation_rules") or {}
+        self.field_id = field_id
+        self.name = details.get("name") or f"Field_{field_id}"
+        self.field_type = details.get("field_type")
+        self.required = bool(details.get("is_required"))
+        options = details.get("options")
+        self.options = frozenset(options) if self.field_type == "single_choice" and options else None
+        self.pattern = _compile_pattern(field_id, rules.get("pattern"))
+        self.min_length = _bound(field_id, rules, "min_length")
+        self.max_length = _bound(field_id, rules, "max_length")
+        self.minimum = _bound(field_id, rules, "min")
+        self.maximum = _bound(field_id, rules, "max")
+        self.integer = bool(rules.get("integer"))
+
+    def check(self, value: str) -> Optional[FieldError]:
+        """First problem with a non-empty answer, or None"""
+        if self.field_type == "number":
+            try:
+                number = float(value)
+            except ValueError:
+                return self._error("not_a_number", f"{self.name} must be a number")
+            if not math.isfinite(number):
+                return self._error("not_a_number", f"{self.name} must be a number")
+            if self.integer and not number.is_integer():
+                return self._error("not_an_integer", f"{self.name} must be a whole number")
+            if self.minimum is not None and number < self.minimum:
+                return self._error("below_minimum", f"{self.name} must be at least {self.minimum:g}")
+            if self.maximum is not None and number > self.maximum:
+                return self._error("above_maximum", f"{self.name} must be at most {self.maximum:g}")
+        elif self.field_type == "email" and not EMAIL_PATTERN.match(value):
+            return self._error("invalid_email", f"{self.name} must be an email address")
+        elif self.options is not None and value not in self.options:
+            return self._error("invalid_option", f"{self.name} must be one of the listed options")
+
+        if self.min_length is not None and len(value) < self.min_length:
+            return self._error("too_short", f"{self.name} must be at least {self.min_length:g} characters")
+        if self.max_length is not None and len(value) > self.max_length:
+            return self._error("too_long", f"{self.name} must be at most {self.max_length:g} characters")
+        if self.pattern is not None and not self.pattern.fullmatch(value):
+            return self._error("pattern_mismatch", f"{self.name} is not in the expected format")
+        return None
+
+    def _error(self, code: str, message: str) -> FieldError:
+        return FieldError(self.field_id, code, message)
+
+
+class FormValidator:
+    def __init__(self, form: dict):
+        self.fields: Dict[str, CompiledField] = {}
+        for form_field in form.get("fields", []):
+            field_id = form_field["field_id"]
+            self.fields[field_id] = CompiledField(field_id, form_field.get("field_details") or {})
+        self.required = tuple(field_id for field_id, field in self.fields.items() if field.required)
+
+    def validate(self, field_responses: Iterable[Any]) -> List[FieldError]:
+        """Every problem with a submission; takes objects with field_id and value"""
+        errors = []
+        answered = set()
+        for field_response in field_responses:
+            field_id = field_response.field_id
+            field = self.fields.get(field_id)
+            if field is None:
+                errors.append(FieldError(field_id, "unknown_field", f"Field {field_id} is not part of this form"))
+                continue
+            if field_id in answered:
+                errors.append(FieldError(field_id, "duplicate_answer", f"{field.name} is answered more than once"))
+                continue
+
+            value = field_response.value
+            if value.strip():
+                answered.add(field_id)
+                error = field.check(value)
+                if error is not None:
+                    errors.append(error)
+
+        for field_id in self.required:
+            if field_id not in answered:
+                errors.append(FieldError(field_id, "required", f"{self.fields[field_id].name} is required"))
+        return errors
+
+
+class ValidatorCache:
+    """LRU of compiled validators keyed by form ID, rebuilt when the form's version moves"""
+
+    def __init__(self, max_entries: int = FORM_VALIDATOR_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, FormValidator]]" = OrderedDict()
+        self.compiles = 0
+
+    def get(self, form: dict) -> FormValidator:
+        form_id = str(form["_id"])
+        version = form.get("version")
+        entry = self._entries.get(form_id)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(form_id)
+            return entry[1]
+
+        validator = FormValidator(form)
+        self.compiles += 1
+        self._entries[form_id] = (version, validator)
+        self._entries.move_to_end(form_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return validator
+
+    def clear(self):
+        self._entries.clear()
+
+
+def _compile_pattern(field_id: str, pattern: Optional[str]):
+    if not pattern:
+        return None
+    try:
+        return re.compile(pattern)
+    except (re.error, TypeError):
+        # A broken rule shouldn't make the form impossible to submit
+        logger.warning(f"Ignoring invalid pattern on field {field_id}: {pattern!r}")
+        return None
+
+
+def _bound(field_id: str, rules: dict, key: str) -> Optional[float]:
+    if rules.get(key) is None:
+        return None
+    try:
+        return float(rules[key])
+    except (TypeError, ValueError):
+        logger.warning(f"Ignoring invalid {key} on field {field_id}: {rules[key]!r}")
+        return None
+
+
+validator_cache = ValidatorCache()
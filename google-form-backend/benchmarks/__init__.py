@@ -0,0 +1 @@
+# Benchmarks for the API's hot paths; run the modules with `python -m benchmarks.<name>`
@@ -0,0 +1,56 @@
+"""Just enough of an HTTP client to drive the ASGI app in-process"""
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import json
+
+
+async def request(app, method: str, path: str, body: Any = None,
+                  headers: Optional[Dict[str, str]] = None) -> Tuple[int, bytes]:
+    """Send one request straight to the ASGI app and return (status, body)"""
+    raw_path, _, query = path.partition("?")
+    payload = json.dumps(body).encode("utf-8") if body is not None else b""
+    request_headers = [(b"host", b"bench")]
+    if body is not None:
+        request_headers += [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())]
+    for key, value in (headers or {}).items():
+        request_headers.append((key.lower().encode(), value.encode()))
+
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": raw_path,
+        "raw_path": raw_path.encode(),
+        "query_string": query.encode(),
+        "root_path": "",
+        "headers": request_headers,
+        "client": ("127.0.0.1", 0),
+        "server": ("bench", 80),
+    }
+
+    body_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        # Streaming responses listen for a disconnect that never comes
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    status = 0
+    chunks = []
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
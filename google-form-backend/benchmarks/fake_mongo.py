@@ -0,0 +1,273 @@
+"""In-memory stand-in for the parts of Motor the routes use.
+
+Every call sleeps for a fixed latency to model the network round trip, which
+is what the write-path benchmarks measure. Only the query and update
+operators the routes rely on are implemented.
+"""
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+import asyncio
+import copy
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+
+def _get_path(document: dict, path: str) -> Any:
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def _has_path(document: dict, path: str) -> bool:
+    value = document
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return False
+        value = value[part]
+    return True
+
+
+def _set_path(document: dict, path: str, value: Any):
+    parts = path.split(".")
+    for part in parts[:-1]:
+        document = document.setdefault(part, {})
+    document[parts[-1]] = value
+
+
+def _matches(document: dict, query: Optional[dict]) -> bool:
+    for key, condition in (query or {}).items():
+        if key == "$and":
+            if not all(_matches(document, clause) for clause in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches(document, clause) for clause in condition):
+                return False
+            continue
+        value = _get_path(document, key)
+        if isinstance(condition, dict) and any(op.startswith("$") for op in condition):
+            for op, operand in condition.items():
+                if op == "$in" and value not in operand:
+                    return False
+                if op == "$gt" and not (value is not None and value > operand):
+                    return False
+                if op == "$gte" and not (value is not None and value >= operand):
+                    return False
+                if op == "$lt" and not (value is not None and value < operand):
+                    return False
+                if op == "$lte" and not (value is not None and value <= operand):
+                    return False
+                if op == "$ne" and value == operand:
+                    return False
+                if op == "$exists" and _has_path(document, key) != bool(operand):
+                    return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _apply_update(document: dict, update: dict):
+    for path, value in update.get("$set", {}).items():
+        _set_path(document, path, value)
+    for path in update.get("$unset", {}):
+        parts = path.split(".")
+        parent = _get_path(document, ".".join(parts[:-1])) if len(parts) > 1 else document
+        if isinstance(parent, dict):
+            parent.pop(parts[-1], None)
+    for path, value in update.get("$inc", {}).items():
+        _set_path(document, path, (_get_path(document, path) or 0) + value)
+    for path, value in update.get("$max", {}).items():
+        current = _get_path(document, path)
+        if current is None or value > current:
+            _set_path(document, path, value)
+    for path, value in update.get("$min", {}).items():
+        current = _get_path(document, path)
+        if current is None or value < current:
+            _set_path(document, path, value)
+
+
+def _project(document: dict, projection: Optional[dict]) -> dict:
+    if not projection:
+        return copy.deepcopy(document)
+    included = {key for key, flag in projection.items() if flag}
+    if included:
+        result = {key: copy.deepcopy(document[key]) for key in included if key in document}
+        if projection.get("_id", 1):
+            result["_id"] = document["_id"]
+        return result
+    return {key: copy.deepcopy(value) for key, value in document.items() if projection.get(key, 1)}
+
+
+class FakeCursor:
+    def __init__(self, collection: "FakeCollection", query: Optional[dict], projection: Optional[dict]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[tuple] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[List[dict]] = None
+
+    def sort(self, key, direction=1):
+        self._sort = key if isinstance(key, list) else [(key, direction)]
+        return self
+
+    def skip(self, count: int):
+        self._skip = count
+        return self
+
+    def limit(self, count: int):
+        self._limit = count
+        return self
+
+    def batch_size(self, count: int):
+        return self
+
+    def _evaluate(self) -> List[dict]:
+        documents = [d for d in self._collection.documents.values() if _matches(d, self._query)]
+        for key, direction in reversed(self._sort):
+            documents.sort(key=lambda d: _get_path(d, key), reverse=direction < 0)
+        documents = documents[self._skip:]
+        if self._limit:
+            documents = documents[:self._limit]
+        return [_project(d, self._projection) for d in documents]
+
+    async def to_list(self, length: Optional[int] = None) -> List[dict]:
+        await self._collection.round_trip()
+        documents = self._evaluate()
+        return documents[:length] if length else documents
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> dict:
+        if self._results is None:
+            await self._collection.round_trip()
+            self._results = self._evaluate()
+        if not self._results:
+            raise StopAsyncIteration
+        return self._results.pop(0)
+
+
+class FakeCollection:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.documents: Dict[Any, dict] = {}
+        self.calls = 0
+
+    async def round_trip(self):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+
+    async def insert_one(self, document: dict, session=None):
+        await self.round_trip()
+        document.setdefault("_id", ObjectId())
+        if document["_id"] in self.documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error _id: {document['_id']}", 11000)
+        self.documents[document["_id"]] = copy.deepcopy(document)
+        return SimpleNamespace(inserted_id=document["_id"])
+
+    async def insert_many(self, documents: List[dict], ordered: bool = True, session=None):
+        await self.round_trip()
+        errors, inserted = [], 0
+        for index, document in enumerate(documents):
+            document.setdefault("_id", ObjectId())
+            if document["_id"] in self.documents:
+                errors.append({"index": index, "code": 11000, "errmsg": f"E11000 duplicate key error _id: {document['_id']}"})
+                if ordered:
+                    break
+                continue
+            self.documents[document["_id"]] = copy.deepcopy(document)
+            inserted += 1
+        if errors:
+            raise BulkWriteError({"writeErrors": errors, "nInserted": inserted})
+        return SimpleNamespace(inserted_ids=[document["_id"] for document in documents])
+
+    async def find_one(self, query: Optional[dict] = None, projection: Optional[dict] = None):
+        await self.round_trip()
+        for document in self.documents.values():
+            if _matches(document, query):
+                return _project(document, projection)
+        return None
+
+    def find(self, query: Optional[dict] = None, projection: Optional[dict] = None) -> FakeCursor:
+        return FakeCursor(self, query, projection)
+
+    async def update_one(self, query: dict, update: dict, upsert: bool = False):
+        await self.round_trip()
+        for document in self.documents.values():
+            if _matches(document, query):
+                _apply_update(document, update)
+                return SimpleNamespace(matched_count=1, modified_count=1, upserted_id=None)
+        if upsert:
+            document = {key: value for key, value in query.items() if not isinstance(value, dict)}
+            document.setdefault("_id", ObjectId())
+            _apply_update(document, update)
+            self.documents[document["_id"]] = document
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=document["_id"])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def bulk_write(self, requests: list, ordered: bool = True):
+        await self.round_trip()
+        matched = modified = 0
+        for request in requests:
+            # pymongo's UpdateOne keeps its arguments in private slots
+            for document in self.documents.values():
+                if _matches(document, request._filter):
+                    _apply_update(document, request._doc)
+                    matched += 1
+                    modified += 1
+                    break
+        return SimpleNamespace(matched_count=matched, modified_count=modified)
+
+    async def find_one_and_update(self, query: dict, update: dict, return_document: bool = False, **kwargs):
+        await self.round_trip()
+        for document in self.documents.values():
+            if _matches(document, query):
+                before = copy.deepcopy(document)
+                _apply_update(document, update)
+                return copy.deepcopy(document) if return_document else before
+        return None
+
+    async def delete_one(self, query: dict):
+        await self.round_trip()
+        for key, document in list(self.documents.items()):
+            if _matches(document, query):
+                del self.documents[key]
+                return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, query: dict, session=None):
+        await self.round_trip()
+        doomed = [key for key, document in self.documents.items() if _matches(document, query)]
+        for key in doomed:
+            del self.documents[key]
+        return SimpleNamespace(deleted_count=len(doomed))
+
+    async def count_documents(self, query: dict) -> int:
+        await self.round_trip()
+        return sum(1 for document in self.documents.values() if _matches(document, query))
+
+    async def create_indexes(self, indexes) -> List[str]:
+        await self.round_trip()
+        return [index.document["name"] for index in indexes]
+
+
+class FakeDatabase:
+    def __init__(self, latency: float = 0.001):
+        self.latency = latency
+        self._collections: Dict[str, FakeCollection] = {}
+
+    def __getitem__(self, name: str) -> FakeCollection:
+        if name not in self._collections:
+            self._collections[name] = FakeCollection(self.latency)
+        return self._collections[name]
+
+    def __getattr__(self, name: str) -> FakeCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self[name]
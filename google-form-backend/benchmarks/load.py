@@ -0,0 +1,184 @@
+"""Load test of the hot endpoints through the ASGI app.
+
+Seeds a database, then drives submit_response, get_form_by_link,
+get_form_responses and get_form_response_summary at each concurrency level
+and prints throughput, latency percentiles and peak RSS as JSON:
+
+    python -m benchmarks.load --forms 20 --fields 10 --responses 2000 --concurrency 1 16 64
+    python -m benchmarks.load --mongodb-url mongodb://localhost:27017 --save baseline.json
+    python -m benchmarks.load --baseline baseline.json --tolerance 10
+
+Without --mongodb-url the in-memory stand-in is used, which measures the
+application's own overhead rather than query performance. With --baseline
+the run exits non-zero when any scenario regresses by more than the
+tolerance.
+
+Admission control applies as in production, so concurrency above a route
+class's limit plus queue shows up as 503s in the errors column. Run with
+ADMISSION_CONTROL=false to measure the endpoints without it.
+"""
+from typing import Callable, Dict, List
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import time
+
+from benchmarks.asgi_client import request
+from benchmarks.fake_mongo import FakeDatabase
+from benchmarks.seed import answers, seed
+from benchmarks.timing import summarize
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is reported in kilobytes on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def scenarios(forms: List[dict], rng: random.Random) -> Dict[str, Callable]:
+    def pick():
+        return rng.choice(forms)
+
+    def submit_response():
+        form = pick()
+        body = {"form_id": str(form["_id"]), "field_responses": answers(form, rng)}
+        return "POST", "/api/v1/responses/", body
+
+    def get_form_by_link():
+        return "GET", f"/api/v1/forms/link/{pick()['unique_link']}", None
+
+    def get_form_responses():
+        return "GET", f"/api/v1/responses/form/{pick()['_id']}?limit=100", None
+
+    def get_form_response_summary():
+        return "GET", f"/api/v1/responses/form/{pick()['_id']}/summary?limit=100", None
+
+    return {
+        "submit_response": submit_response,
+        "get_form_by_link": get_form_by_link,
+        "get_form_responses": get_form_responses,
+        "get_form_response_summary": get_form_response_summary,
+    }
+
+
+async def drive(app, build_request: Callable, requests: int, concurrency: int) -> dict:
+    samples: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, path, body = build_request()
+            started = time.perf_counter()
+            status, _ = await request(app, method, path, body)
+            samples.append(time.perf_counter() - started)
+            if status >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": errors,
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        **summarize(samples),
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Scenario/metric pairs that got worse than the baseline by more than tolerance percent"""
+    regressions = []
+    for key, result in report["results"].items():
+        previous = baseline.get("results", {}).get(key)
+        if previous is None:
+            continue
+        for metric, higher_is_better in (("throughput_rps", True), ("p50_ms", False), ("p99_ms", False)):
+            old, new = previous[metric], result[metric]
+            if not old:
+                continue
+            change = (new - old) / old * 100
+            result.setdefault("vs_baseline_pct", {})[metric] = round(change, 1)
+            if (-change if higher_is_better else change) > tolerance:
+                regressions.append(f"{key} {metric}: {old} -> {new} ({change:+.1f}%)")
+    return regressions
+
+
+async def main(args) -> int:
+    from app.database.connection import mongodb
+    from app.database.indexes import ensure_indexes
+    from app.main import app
+
+    rng = random.Random(args.seed)
+    client = None
+    if args.mongodb_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(args.mongodb_url, maxPoolSize=max(args.concurrency) * 2)
+        await client.drop_database(args.database)
+        db = client[args.database]
+        await ensure_indexes(db)
+    else:
+        db = FakeDatabase(latency=args.latency_ms / 1000)
+
+    # The routes look the database up through this holder; lifespan isn't run
+    mongodb.client, mongodb.database = client, db
+    try:
+        forms = await seed(db, args.forms, args.fields, args.responses, rng)
+        report = {
+            "config": {
+                "backend": "mongodb" if client else "memory",
+                "forms": args.forms,
+                "fields_per_form": args.fields,
+                "responses_per_form": args.responses,
+                "requests": args.requests,
+            },
+            "results": {},
+        }
+        for name, build_request in scenarios(forms, rng).items():
+            if args.only and name not in args.only:
+                continue
+            for concurrency in args.concurrency:
+                result = await drive(app, build_request, args.requests, concurrency)
+                report["results"][f"{name}@{concurrency}"] = result
+    finally:
+        if client is not None:
+            await client.drop_database(args.database)
+            client.close()
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        report["regressions"] = regressions
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+
+    print(json.dumps(report, indent=2))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--forms", type=int, default=20)
+    parser.add_argument("--fields", type=int, default=10, help="Fields per form")
+    parser.add_argument("--responses", type=int, default=1000, help="Seeded responses per form")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per scenario and concurrency level")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--only", nargs="+", help="Run only these scenarios")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Simulated round trip for the in-memory database")
+    parser.add_argument("--mongodb-url", help="Seed and query a real mongod instead of the in-memory database")
+    parser.add_argument("--database", default="googleforms_bench")
+    parser.add_argument("--save", help="Write the report to this file, e.g. to store a new baseline")
+    parser.add_argument("--baseline", help="Compare against a saved report")
+    parser.add_argument("--tolerance", type=float, default=10.0, help="Allowed regression in percent")
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,80 @@
+"""Synthetic forms and responses shaped like the ones the routes write"""
+from datetime import datetime, timedelta
+from typing import List
+import random
+import uuid
+
+from bson import ObjectId
+
+from app.services.answers import encode_answers
+from app.services.field_index import build_field_index
+
+FIELD_TYPES = ["single_choice", "number", "text", "email", "textarea"]
+OPTIONS = ["Excellent", "Good", "Average", "Poor"]
+
+
+def make_form(fields_per_form: int) -> dict:
+    now = datetime.utcnow()
+    fields = []
+    for position in range(fields_per_form):
+        field_type = FIELD_TYPES[position % len(FIELD_TYPES)]
+        details = {"name": f"Question {position}", "field_type": field_type, "is_required": position == 0}
+        if field_type == "single_choice":
+            details["options"] = OPTIONS
+        fields.append({"field_id": str(ObjectId()), "position": position, "field_details": details})
+
+    return {
+        "_id": ObjectId(),
+        "title": "Benchmark form",
+        "description": "Seeded for benchmarking",
+        "unique_link": str(uuid.uuid4()),
+        "is_active": True,
+        "created_at": now,
+        "updated_at": now,
+        "version": 1,
+        "fields": fields,
+        "total_responses": 0,
+        "last_response_at": None,
+    }
+
+
+def answer(field: dict, rng: random.Random) -> str:
+    field_type = field["field_details"]["field_type"]
+    if field_type == "single_choice":
+        return rng.choice(OPTIONS)
+    if field_type == "number":
+        return str(rng.randint(0, 100))
+    if field_type == "email":
+        return f"user{rng.randint(0, 10_000)}@example.com"
+    return f"Answer {rng.randint(0, 1_000)}"
+
+
+def answers(form: dict, rng: random.Random) -> List[dict]:
+    """field_responses as a client submits them"""
+    return [{"field_id": field["field_id"], "value": answer(field, rng)} for field in form["fields"]]
+
+
+async def seed(db, forms: int, fields_per_form: int, responses_per_form: int,
+               rng: random.Random, chunk_size: int = 1000) -> List[dict]:
+    """Insert the forms and their responses; returns the form documents"""
+    documents = [make_form(fields_per_form) for _ in range(forms)]
+    if documents:
+        await db.forms.insert_many(documents)
+
+    start = datetime.utcnow() - timedelta(days=30)
+    for form in documents:
+        form_id = str(form["_id"])
+        field_index = build_field_index(form)
+        for offset in range(0, responses_per_form, chunk_size):
+            # Stored in the answers layout the routes write
+            batch = [
+                {
+                    "form_id": form_id,
+                    "submitted_at": start + timedelta(seconds=rng.randint(0, 30 * 86400)),
+                    "answers": encode_answers(answers(form, rng), field_index),
+                }
+                for _ in range(min(chunk_size, responses_per_form - offset))
+            ]
+            await db.responses.insert_many(batch)
+        await db.forms.update_one({"_id": form["_id"]}, {"$set": {"total_responses": responses_per_form}})
+    return documents
@@ -0,0 +1,123 @@
+"""Serialization cost of the list routes: Pydantic path vs the trusted fast path.
+
+Builds synthetic form and response documents shaped like the ones in Mongo
+and times turning them into response bytes both ways:
+
+    python -m benchmarks.serialization --forms 1000 --responses 10000
+"""
+from datetime import datetime, timedelta
+import argparse
+import json
+import time
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+from app.schemas.form import Form, FormPage
+from app.schemas.response import FormResponse, FormResponsePage
+from app.services.fast_json import dumps, orjson, trusted_form, trusted_response
+from benchmarks.timing import summarize
+
+
+def make_forms(count: int, fields_per_form: int):
+    now = datetime.utcnow()
+    return [
+        {
+            "_id": ObjectId(),
+            "title": f"Form {i}",
+            "description": "Synthetic form",
+            "unique_link": f"link-{i}",
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now,
+            "version": 1,
+            "total_responses": i,
+            "last_response_at": now,
+            "fields": [
+                {
+                    "field_id": str(ObjectId()),
+                    "position": position,
+                    "field_details": {
+                        "name": f"Question {position}",
+                        "field_type": "single_choice",
+                        "options": ["Excellent", "Good", "Average", "Poor"],
+                        "is_required": True,
+                    },
+                }
+                for position in range(fields_per_form)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def make_responses(count: int, answers_per_response: int):
+    start = datetime.utcnow()
+    form_id = str(ObjectId())
+    field_ids = [str(ObjectId()) for _ in range(answers_per_response)]
+    return [
+        {
+            "_id": ObjectId(),
+            "form_id": form_id,
+            "submitted_at": start - timedelta(seconds=i),
+            "field_responses": [{"field_id": field_id, "value": "Good"} for field_id in field_ids],
+        }
+        for i in range(count)
+    ]
+
+
+def pydantic_forms(documents):
+    forms = [Form(id=str(d["_id"]), **d) for d in documents]
+    return json.dumps(jsonable_encoder(FormPage(items=forms, next_cursor=None))).encode("utf-8")
+
+
+def fast_forms(documents):
+    return dumps({"items": [trusted_form(d) for d in documents], "next_cursor": None})
+
+
+def pydantic_responses(documents):
+    responses = [FormResponse(id=str(d["_id"]), **d) for d in documents]
+    return json.dumps(jsonable_encoder(FormResponsePage(items=responses, next_cursor=None))).encode("utf-8")
+
+
+def fast_responses(documents):
+    return dumps({"items": [trusted_response(d) for d in documents], "next_cursor": None})
+
+
+def _time(function, documents, repeat: int):
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(documents)
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def main(args):
+    forms = make_forms(args.forms, args.fields)
+    responses = make_responses(args.responses, args.fields)
+
+    report = {"encoder": "orjson" if orjson is not None else "json"}
+    for name, documents, slow, fast in (
+        ("get_forms", forms, pydantic_forms, fast_forms),
+        ("get_form_responses", responses, pydantic_responses, fast_responses),
+    ):
+        pydantic_path = _time(slow, documents, args.repeat)
+        fast_path = _time(fast, documents, args.repeat)
+        report[name] = {
+            "documents": len(documents),
+            "pydantic": pydantic_path,
+            "fast": fast_path,
+            "p50_speedup": round(pydantic_path["p50_ms"] / fast_path["p50_ms"], 2) if fast_path["p50_ms"] else None,
+        }
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--forms", type=int, default=1000)
+    parser.add_argument("--responses", type=int, default=10000)
+    parser.add_argument("--fields", type=int, default=10, help="Fields per form and answers per response")
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,106 @@
+"""Latency of the write routes with and without the read-after-write find_one.
+
+Replays the database calls each route makes, before and after echoing the
+written document, and prints p50/p99 per endpoint as JSON:
+
+    python -m benchmarks.write_roundtrips --latency-ms 1
+    python -m benchmarks.write_roundtrips --mongodb-url mongodb://localhost:27017
+"""
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import time
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from benchmarks.fake_mongo import FakeDatabase
+from benchmarks.timing import summarize
+
+
+async def _create_field(db, legacy: bool):
+    result = await db.fields.insert_one({"name": "Name", "field_type": "text", "created_at": datetime.utcnow()})
+    if legacy:
+        await db.fields.find_one({"_id": result.inserted_id})
+
+
+async def _create_form(db, legacy: bool):
+    result = await db.forms.insert_one({"title": "Survey", "fields": [], "created_at": datetime.utcnow()})
+    if legacy:
+        await db.forms.find_one({"_id": result.inserted_id})
+
+
+async def _submit_response(db, legacy: bool, form_id: ObjectId):
+    await db.forms.find_one({"_id": form_id})
+    result = await db.responses.insert_one({"form_id": str(form_id), "submitted_at": datetime.utcnow(), "field_responses": []})
+    if legacy:
+        await db.responses.find_one({"_id": result.inserted_id})
+
+
+async def _update(collection, legacy: bool, document_id: ObjectId):
+    update = {"$set": {"updated_at": datetime.utcnow()}}
+    if legacy:
+        await collection.update_one({"_id": document_id}, update)
+        await collection.find_one({"_id": document_id})
+    else:
+        await collection.find_one_and_update({"_id": document_id}, update, return_document=ReturnDocument.AFTER)
+
+
+async def _time(operation, iterations: int):
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await operation()
+        samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+async def run(db, iterations: int) -> dict:
+    form_id = (await db.forms.insert_one({"title": "Target", "fields": []})).inserted_id
+    field_id = (await db.fields.insert_one({"name": "Target", "field_type": "text"})).inserted_id
+
+    endpoints = {
+        "create_field": lambda legacy: _create_field(db, legacy),
+        "create_form": lambda legacy: _create_form(db, legacy),
+        "submit_response": lambda legacy: _submit_response(db, legacy, form_id),
+        "update_field": lambda legacy: _update(db.fields, legacy, field_id),
+        "update_form": lambda legacy: _update(db.forms, legacy, form_id),
+    }
+
+    report = {}
+    for name, operation in endpoints.items():
+        legacy = await _time(lambda: operation(True), iterations)
+        current = await _time(lambda: operation(False), iterations)
+        report[name] = {
+            "legacy": legacy,
+            "current": current,
+            "p50_speedup": round(legacy["p50_ms"] / current["p50_ms"], 2) if current["p50_ms"] else None,
+        }
+    return report
+
+
+async def main(args):
+    if args.mongodb_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        client = AsyncIOMotorClient(args.mongodb_url)
+        db = client[args.database]
+        try:
+            report = await run(db, args.iterations)
+        finally:
+            await client.drop_database(args.database)
+            client.close()
+    else:
+        report = await run(FakeDatabase(latency=args.latency_ms / 1000), args.iterations)
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=1.0, help="Simulated round trip for the in-memory database")
+    parser.add_argument("--mongodb-url", help="Benchmark against a real mongod instead of the in-memory database")
+    parser.add_argument("--database", default="googleforms_bench")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,34 @@
+import unittest
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.services.export import _cell, export_header, export_row
+
+COLUMNS = [("f1", "Comment", "text"), ("f2", "Amount", "number"), ("f3", "=HYPERLINK()", None)]
+
+
+class ExportRowTest(unittest.TestCase):
+    def response(self, **answers) -> dict:
+        return {"_id": ObjectId(), "submitted_at": datetime(2024, 5, 1), "answers": answers}
+
+    def test_quotes_formula_text(self):
+        for value in ("=1+1", "+SUM(A1)", "-2+3", "@cmd", "\tx", "\rx"):
+            row = export_row(self.response(f1=value, f3=value), COLUMNS)
+            self.assertEqual(row[2], "'" + value)
+            self.assertEqual(row[4], "'" + value)
+
+    def test_leaves_numbers_in_number_fields(self):
+        row = export_row(self.response(f1="plain", f2="-12.5"), COLUMNS)
+        self.assertEqual(row[2:], ["plain", "-12.5", ""])
+        self.assertEqual(_cell("C2", row[3], True), '<c r="C2"><v>-12.5</v></c>')
+
+        row = export_row(self.response(f2="-1+cmd"), COLUMNS)
+        self.assertEqual(row[3], "'-1+cmd")
+
+    def test_quotes_headers(self):
+        self.assertEqual(export_header(COLUMNS)[-1], "'=HYPERLINK()")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import asyncio
+import unittest
+
+from app.services.form_cache import CachedForm, FormCache, SharedCacheBackend
+from app.services.shared_store import MemoryStore
+
+FORM_ID = "6ad4b82f7539336fa7cf41a4"
+LINK = "b3c1d7e2"
+
+
+class FormCacheTest(unittest.TestCase):
+    def test_invalidate_drops_both_keys(self):
+        cache = FormCache()
+        cache.set(FORM_ID, LINK, CachedForm('"v1"', b"{}"))
+        self.assertIsNotNone(cache.get("link", LINK))
+        cache.invalidate(FORM_ID)
+        self.assertIsNone(cache.get("id", FORM_ID))
+        self.assertIsNone(cache.get("link", LINK))
+
+    def test_fill_after_invalidation_is_refused_until_tombstone_expires(self):
+        cache = FormCache(tombstone_ttl=60)
+        cache.invalidate(FORM_ID)
+        cache.set(FORM_ID, LINK, CachedForm('"v1"', b"{}"))
+        self.assertIsNone(cache.get("id", FORM_ID))
+
+        cache = FormCache(tombstone_ttl=0)
+        cache.invalidate(FORM_ID)
+        cache.set(FORM_ID, LINK, CachedForm('"v2"', b"{}"))
+        self.assertEqual(cache.get("id", FORM_ID).etag, '"v2"')
+
+
+class SharedCacheBackendTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        # Two workers sharing one store
+        self.store = MemoryStore()
+        self.first = SharedCacheBackend(self.store, tombstone_ttl=60)
+        self.second = SharedCacheBackend(self.store, tombstone_ttl=60)
+        await self.first.start()
+        await self.second.start()
+        await asyncio.sleep(0)
+
+    async def asyncTearDown(self):
+        await self.first.stop()
+        await self.second.stop()
+
+    async def test_fill_is_visible_to_other_worker(self):
+        await self.first.set(FORM_ID, LINK, CachedForm('"v1"', b'{"title": "T"}'))
+        cached = await self.second.get("link", LINK)
+        self.assertEqual(cached, CachedForm('"v1"', b'{"title": "T"}'))
+
+    async def test_invalidation_reaches_local_copies(self):
+        await self.first.set(FORM_ID, LINK, CachedForm('"v1"', b"{}"))
+        self.assertIsNotNone(await self.second.get("id", FORM_ID))
+
+        await self.first.invalidate(FORM_ID)
+        await asyncio.sleep(0)
+        self.assertEqual(self.second.invalidations_received, 1)
+        self.assertIsNone(self.second.local.get("id", FORM_ID))
+        self.assertIsNone(await self.second.get("id", FORM_ID))
+
+    async def test_stale_fill_after_invalidation_is_not_kept(self):
+        # The second worker read version 1, then the first worker edited the form and invalidated
+        await self.first.invalidate(FORM_ID)
+        await self.second.set(FORM_ID, LINK, CachedForm('"v1"', b"{}"))
+
+        self.assertIsNone(await self.first.get("id", FORM_ID))
+        self.assertIsNone(await self.second.get("link", LINK))
+
+    async def test_invalidation_between_check_and_write_undoes_fill(self):
+        real_set = self.store.set
+
+        async def set_racing_invalidation(key, value, ttl):
+            await real_set(key, value, ttl)
+            if key == f"formcache:id:{FORM_ID}":
+                await self.first.invalidate(FORM_ID)
+
+        self.store.set = set_racing_invalidation
+        await self.second.set(FORM_ID, LINK, CachedForm('"v1"', b"{}"))
+        self.store.set = real_set
+
+        for key in (f"formcache:id:{FORM_ID}", f"formcache:link:{LINK}", f"formcache:owner:{FORM_ID}"):
+            self.assertIsNone(await self.store.get(key))
+        self.assertIsNone(await self.second.get("id", FORM_ID))
+
+    async def test_fill_after_tombstone_expires(self):
+        cache = SharedCacheBackend(self.store, tombstone_ttl=0.01)
+        await cache.invalidate(FORM_ID)
+        await asyncio.sleep(0.02)
+        await cache.set(FORM_ID, LINK, CachedForm('"v2"', b"{}"))
+        self.assertEqual((await self.second.get("id", FORM_ID)).etag, '"v2"')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from datetime import datetime
+
+from bson import ObjectId
+
+from app.services.pagination import decode_cursor, encode_cursor, keyset_filter
+
+SORT = [("submitted_at", -1), ("_id", -1)]
+
+
+class KeysetFilterTest(unittest.TestCase):
+    def test_round_trips_sort_key_values(self):
+        last = {"submitted_at": datetime(2024, 5, 1), "_id": ObjectId()}
+        self.assertEqual(keyset_filter(SORT, decode_cursor(encode_cursor(last))), {"$or": [
+            {"submitted_at": {"$lt": last["submitted_at"]}},
+            {"submitted_at": last["submitted_at"], "_id": {"$lt": last["_id"]}},
+        ]})
+
+    def test_rejects_non_scalar_values(self):
+        for value in ({"$ne": None}, [1], None, True):
+            cursor = encode_cursor({"submitted_at": datetime(2024, 5, 1), "_id": value})
+            with self.assertRaisesRegex(ValueError, "Invalid cursor"):
+                keyset_filter(SORT, decode_cursor(cursor))
+
+    def test_rejects_missing_key(self):
+        with self.assertRaisesRegex(ValueError, "Invalid cursor"):
+            keyset_filter(SORT, decode_cursor(encode_cursor({"_id": ObjectId()})))
+
+
+if __name__ == "__main__":
+    unittest.main()
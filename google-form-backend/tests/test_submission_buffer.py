@@ -0,0 +1,182 @@
+import asyncio
+import fcntl
+import glob
+import os
+import tempfile
+import time
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest import mock
+
+from bson import ObjectId, json_util
+from pymongo.errors import AutoReconnect
+
+from app.services.submission_buffer import SubmissionBuffer
+from benchmarks.fake_mongo import FakeDatabase
+
+
+class FlakyResponses:
+    """Wraps db.responses so chosen insert_many calls fail before writing anything"""
+
+    def __init__(self, collection, fail_calls):
+        self.collection = collection
+        self.fail_calls = set(fail_calls)
+        self.calls = 0
+
+    async def insert_many(self, documents, ordered=True):
+        self.calls += 1
+        if self.calls in self.fail_calls:
+            raise AutoReconnect("connection reset")
+        return await self.collection.insert_many(documents, ordered=ordered)
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+class SubmissionBufferTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.base_path = os.path.join(self.directory.name, "submissions.log")
+        self.db = FakeDatabase(latency=0)
+        self.form_id = ObjectId()
+        await self.db.forms.insert_one({"_id": self.form_id, "fields": [], "total_responses": 0})
+
+    async def asyncTearDown(self):
+        self.directory.cleanup()
+
+    def buffer(self, **options) -> SubmissionBuffer:
+        options = {"flush_size": 500, "flush_interval_ms": 60000, "fsync": False, **options}
+        return SubmissionBuffer(self.base_path, **options)
+
+    def document(self) -> dict:
+        return {"_id": ObjectId(), "form_id": str(self.form_id), "submitted_at": datetime.utcnow(), "answers": {}}
+
+    async def total_responses(self) -> int:
+        form = await self.db.forms.find_one({"_id": self.form_id})
+        return form["total_responses"]
+
+    def crash(self, buffer: SubmissionBuffer):
+        """Drop the process's descriptors without flushing, as a killed worker would"""
+        buffer._flusher.cancel()
+        os.close(buffer._fd)
+        os.close(buffer._lock_fd)
+
+    def write_log(self, path: str, documents):
+        with open(path, "wb") as f:
+            for document in documents:
+                f.write((json_util.dumps(document) + "\n").encode("utf-8"))
+
+    async def test_flush_writes_documents_and_removes_segments(self):
+        buffer = self.buffer()
+        await buffer.start(self.db)
+        for _ in range(3):
+            await buffer.submit(self.document())
+        await buffer.flush()
+
+        self.assertEqual(len(self.db.responses.documents), 3)
+        self.assertEqual(await self.total_responses(), 3)
+        self.assertEqual(glob.glob(f"{buffer.path}.*.flushing"), [])
+        self.assertEqual(os.path.getsize(buffer.path), 0)
+
+        await buffer.stop()
+        self.assertEqual(glob.glob(f"{self.base_path}*"), [])
+
+    async def test_log_path_is_per_process(self):
+        buffer = self.buffer()
+        await buffer.start(self.db)
+        self.assertEqual(buffer.path, f"{self.base_path}.{os.getpid()}")
+        self.assertTrue(os.path.exists(f"{buffer.path}.lock"))
+        await buffer.stop()
+
+    async def test_replays_log_after_crash(self):
+        buffer = self.buffer()
+        await buffer.start(self.db)
+        documents = [self.document() for _ in range(4)]
+        for document in documents:
+            await buffer.submit(document)
+        self.crash(buffer)
+        self.assertEqual(self.db.responses.documents, {})
+
+        restarted = self.buffer()
+        await restarted.start(self.db)
+        self.assertEqual(set(self.db.responses.documents), {document["_id"] for document in documents})
+        self.assertEqual(await self.total_responses(), 4)
+        await restarted.stop()
+
+    async def test_replay_skips_documents_already_written(self):
+        documents = [self.document() for _ in range(3)]
+        await self.db.responses.insert_one(dict(documents[0]))
+        self.write_log(f"{self.base_path}.{os.getpid()}.{time.time_ns()}.flushing", documents)
+
+        buffer = self.buffer()
+        await buffer.start(self.db)
+        self.assertEqual(len(self.db.responses.documents), 3)
+        self.assertEqual(buffer.duplicates, 1)
+        self.assertEqual(buffer.flushed, 2)
+        self.assertEqual(await self.total_responses(), 2)
+        await buffer.stop()
+
+    async def test_adopts_logs_of_dead_workers_only(self):
+        dead, live = [self.document()], [self.document()]
+        dead_path, live_path = f"{self.base_path}.999999991", f"{self.base_path}.999999992"
+        self.write_log(dead_path, dead)
+        open(f"{dead_path}.lock", "w").close()
+        self.write_log(live_path, live)
+        live_lock = os.open(f"{live_path}.lock", os.O_RDWR | os.O_CREAT)
+        fcntl.flock(live_lock, fcntl.LOCK_EX)
+        try:
+            buffer = self.buffer()
+            await buffer.start(self.db)
+            self.assertEqual(set(self.db.responses.documents), {dead[0]["_id"]})
+            self.assertFalse(os.path.exists(dead_path))
+            self.assertFalse(os.path.exists(f"{dead_path}.lock"))
+            self.assertTrue(os.path.exists(live_path))
+            await buffer.stop()
+        finally:
+            os.close(live_lock)
+
+    async def test_failed_chunk_keeps_counts_exact_on_retry(self):
+        buffer = self.buffer(flush_size=2)
+        responses = FlakyResponses(self.db.responses, fail_calls={2})
+        db = SimpleNamespace(responses=responses, forms=self.db.forms, form_stats=self.db.form_stats)
+        await buffer.start(db)
+        for _ in range(4):
+            await buffer.submit(self.document())
+
+        # The first chunk is written and counted before the second one fails; the retry sees it as duplicates
+        await buffer.flush()
+        self.assertEqual(await self.total_responses(), 2)
+
+        await buffer.flush()
+        self.assertEqual(responses.calls, 4)
+        self.assertEqual(len(self.db.responses.documents), 4)
+        self.assertEqual(buffer.duplicates, 2)
+        self.assertEqual(await self.total_responses(), 4)
+        await buffer.stop()
+
+    async def test_rotation_during_fsync_keeps_acknowledged_document(self):
+        buffer = self.buffer(fsync=True)
+        await buffer.start(self.db)
+        real_fsync = os.fsync
+
+        def slow_fsync(fd):
+            time.sleep(0.05)
+            real_fsync(fd)
+
+        document = self.document()
+        with mock.patch("os.fsync", slow_fsync):
+            submit = asyncio.create_task(buffer.submit(document))
+            await asyncio.sleep(0.01)
+            # The log is rotated and flushed while the fsync of its last line is still running
+            await buffer.flush()
+            self.assertIn(document["_id"], self.db.responses.documents)
+            self.assertEqual(await submit, document["_id"])
+
+        self.assertEqual(buffer._syncing, {})
+        self.assertEqual(buffer._retired, set())
+        await buffer.stop()
+
+
+if __name__ == "__main__":
+    unittest.main()
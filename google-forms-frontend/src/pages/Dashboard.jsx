@@ -20,7 +20,8 @@ const animations = 'hover:shadow-xl transition-all duration-300 hover:-translate
 const cardHover = 'group hover:shadow-2xl transition-all duration-300 hover:-translate-y-2';
 
 const Dashboard = () => {
-  const { data: forms, loading, error, refetch } = useApi(() => formService.getForms());
+  const { data, loading, error, refetch } = useApi(() => formService.getFormSummaries());
+  const forms = data?.items;
 
   if (loading) {
     return (
@@ -225,7 +226,7 @@ const FormStats = ({ form }) => (
   <div className="flex items-center text-sm text-gray-500 mb-6 bg-gradient-to-r from-gray-50 to-blue-50 rounded-xl p-4 border border-gray-100">
     <div className="flex items-center">
       <FileText className="w-4 h-4 mr-2 text-blue-500" />
-      <span className="font-medium">{form.fields?.length || 0} fields</span>
+      <span className="font-medium">{form.field_count || 0} fields</span>
     </div>
     <span className="mx-4 text-gray-300">•</span>
     <div className="flex items-center">
@@ -40,6 +40,7 @@ export const fieldService = {
 // Form Services
 export const formService = {
   getForms: () => api.get('/forms'),
+  getFormSummaries: () => api.get('/forms/summary'),
   createForm: (formData) => api.post('/forms', formData),
   getForm: (id) => api.get(`/forms/${id}`),
   getFormByLink: (uniqueLink) => api.get(`/forms/link/${uniqueLink}`),
@@ -52,6 +53,7 @@ export const responseService = {
   submitResponse: (responseData) => api.post('/responses', responseData),
   getFormResponses: (formId) => api.get(`/responses/form/${formId}`),
   getFormResponseSummary: (formId) => api.get(`/responses/form/${formId}/summary`),
+  getFormAnalytics: (formId) => api.get(`/responses/form/${formId}/analytics`),
   getResponse: (id) => api.get(`/responses/${id}`),
 };
 